@@ -3,6 +3,11 @@ ASGI config for elegant_nails project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve the site through this entry point to get live dashboard updates over
+Server-Sent Events, e.g.::
+
+    gunicorn elegant_nails.asgi:application -k uvicorn.workers.UvicornWorker
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
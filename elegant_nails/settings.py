@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+import sys
+import tempfile
 import dj_database_url
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -27,6 +29,9 @@ SECRET_KEY = os.environ.get('SECRET_KEY', 'django-insecure-f%466zg&p%-k5ipe3iv&q
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = os.environ.get('DEBUG', 'False').lower() == 'true'
 
+# Running `manage.py test`
+TESTING = sys.argv[1:2] == ['test']
+
 ALLOWED_HOSTS = [
     'localhost',
     '127.0.0.1',
@@ -54,14 +59,17 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'nails.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
+    'nails.middleware.ReplicaRoutingMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'nails.middleware.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'elegant_nails.urls'
@@ -88,14 +96,68 @@ WSGI_APPLICATION = 'elegant_nails.wsgi.application'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
 # Database configuration - Render automatically provides DATABASE_URL
+DATABASE_POOL = os.environ.get('DATABASE_POOL', 'False').lower() == 'true'
+
 DATABASES = {
     'default': dj_database_url.config(
         default=os.environ.get('DATABASE_URL', 'sqlite:///db.sqlite3'),
-        conn_max_age=600,
+        # Pooled connections are returned to the pool, not kept per worker
+        conn_max_age=0 if DATABASE_POOL else 600,
         conn_health_checks=True,
     )
 }
 
+# Optional read replica for dashboard, analytics and public page reads
+DATABASE_REPLICA_URL = os.environ.get('DATABASE_REPLICA_URL')
+if DATABASE_REPLICA_URL:
+    DATABASES['replica'] = dj_database_url.parse(
+        DATABASE_REPLICA_URL,
+        conn_max_age=0 if DATABASE_POOL else 600,
+        conn_health_checks=True,
+    )
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+elif TESTING:
+    # Give the test suite a replica alias mirroring the test database, so
+    # the routing can be tested without a second database server
+    DATABASES['replica'] = {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
+
+# psycopg 3 connection pool, sized per worker process
+if DATABASE_POOL:
+    for alias in DATABASES:
+        if DATABASES[alias]['ENGINE'] == 'django.db.backends.postgresql':
+            DATABASES[alias].setdefault('OPTIONS', {})['pool'] = {
+                'min_size': int(os.environ.get('DATABASE_POOL_MIN_SIZE', 2)),
+                'max_size': int(os.environ.get('DATABASE_POOL_MAX_SIZE', 10)),
+                'timeout': float(os.environ.get('DATABASE_POOL_TIMEOUT', 10)),
+            }
+
+DATABASE_ROUTERS = ['nails.routers.PrimaryReplicaRouter']
+
+
+# Cache - rate limits, availability results, cached calendar events, the
+# live event log and (with Redis) sessions. Set REDIS_URL in production so
+# every gunicorn worker shares it. Without it each worker gets its own
+# in-memory cache: rate limits then apply per worker, and the features that
+# need cross-worker state (the live event log, cached calendar events) are
+# off. Version numbers that caches and ETags are keyed on live in the
+# database (nails.Counter) either way.
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'elegant-nails',
+        }
+    }
+NAILS_SHARED_CACHE = bool(REDIS_URL)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -139,9 +201,24 @@ STATICFILES_DIRS = [BASE_DIR / 'static']
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
-# Static files configuration for production
-if not DEBUG:
-    STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+# Storage backends: content-hashed media uploads, and compressed, hashed
+# static files in production (STATICFILES_STORAGE was removed in Django 5.1)
+STORAGES = {
+    'default': {
+        'BACKEND': 'nails.storage.HashedMediaStorage',
+    },
+    'staticfiles': {
+        'BACKEND': (
+            # The manifest only exists after collectstatic, which tests don't run
+            'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG or TESTING
+            else 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+        ),
+    },
+}
+
+# Cache lifetimes for uploaded media; hashed names never change content
+NAILS_MEDIA_IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+NAILS_MEDIA_MAX_AGE = int(os.environ.get('NAILS_MEDIA_MAX_AGE', 3600))
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -171,6 +248,104 @@ if not DEBUG:
     SECURE_HSTS_INCLUDE_SUBDOMAINS = True
     SECURE_HSTS_PRELOAD = True
 
+# Logging - request timings and errors go to stdout so Render collects them
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'structured': {
+            'format': 'level=%(levelname)s logger=%(name)s %(message)s',
+        },
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'structured',
+        },
+    },
+    'loggers': {
+        'nails': {
+            'handlers': ['console'],
+            # One line per request would drown the test runner's output
+            'level': os.environ.get('NAILS_LOG_LEVEL', 'WARNING' if TESTING else 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
+# Each worker writes its metrics here (at most every WRITE_SECONDS) so
+# /dashboard/metrics/ can report the sum over all workers. Empty to report
+# only the worker that answers the scrape.
+NAILS_METRICS_DIR = os.environ.get(
+    'NAILS_METRICS_DIR', '' if TESTING else os.path.join(tempfile.gettempdir(), 'elegant-nails-metrics'),
+)
+NAILS_METRICS_WRITE_SECONDS = float(os.environ.get('NAILS_METRICS_WRITE_SECONDS', 5))
+
+# Opt-in profiling of dashboard views (staff only, ?_profile=1 or X-Profile: 1)
+NAILS_PROFILING_ENABLED = os.environ.get('NAILS_PROFILING_ENABLED', 'True').lower() == 'true'
+NAILS_PROFILE_DIR = os.environ.get('NAILS_PROFILE_DIR', BASE_DIR / 'profiles')
+NAILS_PROFILE_KEEP = int(os.environ.get('NAILS_PROFILE_KEEP', 20))
+NAILS_PROFILE_VIEWS = [
+    'dashboard',
+    'appointment_list',
+    'appointment_detail',
+    'client_list',
+    'analytics',
+]
+
+# Rate limiting for the public availability and booking endpoints
+NAILS_RATELIMIT_ENABLED = os.environ.get('NAILS_RATELIMIT_ENABLED', 'True').lower() == 'true'
+# Only trust X-Forwarded-For behind a proxy that appends to it. On Render
+# REMOTE_ADDR is always the proxy, so it's trusted there by default; the
+# client IP is the entry added by the outermost of PROXY_COUNT proxies
+NAILS_RATELIMIT_TRUST_FORWARDED = os.environ.get(
+    'NAILS_RATELIMIT_TRUST_FORWARDED', 'True' if RENDER_EXTERNAL_HOSTNAME else 'False',
+).lower() == 'true'
+NAILS_RATELIMIT_PROXY_COUNT = int(os.environ.get('NAILS_RATELIMIT_PROXY_COUNT', 1))
+NAILS_RATELIMIT_AVAILABILITY = os.environ.get('NAILS_RATELIMIT_AVAILABILITY', '60/m')
+NAILS_RATELIMIT_BOOKING = os.environ.get('NAILS_RATELIMIT_BOOKING', '5/m')
+NAILS_AVAILABILITY_CACHE_SECONDS = int(os.environ.get('NAILS_AVAILABILITY_CACHE_SECONDS', 30))
+
+# Views whose GET requests may read from the replica. Bookings and
+# availability always read the primary.
+NAILS_REPLICA_VIEWS = [
+    'home',
+    'services',
+    'portfolio',
+    'dashboard',
+    'appointment_list',
+    'client_list',
+    'analytics',
+]
+# How long a browser stays on the primary after it writes something
+NAILS_REPLICA_PIN_SECONDS = int(os.environ.get('NAILS_REPLICA_PIN_SECONDS', 10))
+
+# Live dashboard updates (Server-Sent Events). Needs ASGI and Redis; each
+# open dashboard reads the cache once per poll interval.
+NAILS_EVENT_TTL = int(os.environ.get('NAILS_EVENT_TTL', 300))
+NAILS_EVENT_BACKLOG = 200
+NAILS_EVENT_POLL_SECONDS = float(os.environ.get('NAILS_EVENT_POLL_SECONDS', 1))
+
+# iCalendar feed of appointments for phone calendars
+NAILS_CALENDAR_PAST_DAYS = int(os.environ.get('NAILS_CALENDAR_PAST_DAYS', 7))
+NAILS_CALENDAR_CACHE_SECONDS = 60 * 60 * 24
+
+# Sessions and flash messages - with Redis, sessions are read from the cache
+# and only written to the DB once logged in. Without Redis the cache is per
+# worker, so sessions stay in django_session. Visitors' messages use a
+# signed cookie. Set MESSAGE_STORAGE=django.contrib.messages.storage.fallback.FallbackStorage
+# to go back to Django's default.
+SESSION_ENGINE = os.environ.get(
+    'SESSION_ENGINE',
+    'nails.sessions' if REDIS_URL else 'django.contrib.sessions.backends.db',
+)
+MESSAGE_STORAGE = os.environ.get('MESSAGE_STORAGE', 'nails.message_storage.MessageStorage')
+NAILS_SESSION_CLEANUP_BATCH_SIZE = int(os.environ.get('NAILS_SESSION_CLEANUP_BATCH_SIZE', 5000))
+
+# Dashboard JSON API page sizes (?limit= is capped at the maximum)
+NAILS_API_PAGE_SIZE = int(os.environ.get('NAILS_API_PAGE_SIZE', 100))
+NAILS_API_MAX_PAGE_SIZE = 500
+
 LOGIN_REDIRECT_URL = '/dashboard/'
 LOGOUT_REDIRECT_URL = 'home'
 LOGIN_URL = '/login/'
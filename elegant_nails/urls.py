@@ -1,9 +1,11 @@
 from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
-from django.conf.urls.static import static
+from nails.media import serve_media
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    # Uploaded media, served in production too (static() only works with DEBUG on)
+    path(f"{settings.MEDIA_URL.strip('/')}/<path:path>", serve_media, name='media'),
     path('', include('nails.urls')),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+]
\ No newline at end of file
@@ -1,6 +1,7 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.utils.html import format_html
-from .models import Service, PortfolioItem, Appointment, WorkingHours
+from .bulk import bulk_update_status
+from .models import Service, PortfolioItem, Appointment, ArchivedAppointment, CalendarFeed, WorkingHours
 
 @admin.register(Service)
 class ServiceAdmin(admin.ModelAdmin):
@@ -23,6 +24,30 @@ class AppointmentAdmin(admin.ModelAdmin):
     search_fields = ('client_name', 'client_email', 'client_phone')
     list_editable = ('status',)
     date_hierarchy = 'appointment_date'
+    actions = ['mark_confirmed', 'mark_completed', 'mark_cancelled', 'mark_no_show']
+    
+    def _bulk_status(self, request, queryset, status):
+        updated_ids, skipped = bulk_update_status(queryset.values_list('id', flat=True), status)
+        label = dict(Appointment.STATUS_CHOICES)[status]
+        self.message_user(request, f"{len(updated_ids)} appointment(s) marked as {label}.", messages.SUCCESS)
+        if skipped:
+            self.message_user(request, f"{skipped} appointment(s) skipped: not allowed from their current status.", messages.WARNING)
+    
+    @admin.action(description="Mark selected as Confirmed")
+    def mark_confirmed(self, request, queryset):
+        self._bulk_status(request, queryset, 'CONFIRMED')
+    
+    @admin.action(description="Mark selected as Completed")
+    def mark_completed(self, request, queryset):
+        self._bulk_status(request, queryset, 'COMPLETED')
+    
+    @admin.action(description="Mark selected as Cancelled")
+    def mark_cancelled(self, request, queryset):
+        self._bulk_status(request, queryset, 'CANCELLED')
+    
+    @admin.action(description="Mark selected as No-show")
+    def mark_no_show(self, request, queryset):
+        self._bulk_status(request, queryset, 'NO_SHOW')
     
     def quick_actions(self, obj):
         return format_html(
@@ -31,6 +56,31 @@ class AppointmentAdmin(admin.ModelAdmin):
         )
     quick_actions.short_description = 'Actions'
 
+@admin.register(ArchivedAppointment)
+class ArchivedAppointmentAdmin(admin.ModelAdmin):
+    list_display = ('client_name', 'service_name', 'appointment_date', 'appointment_time', 'status', 'archived_at')
+    list_filter = ('status',)
+    search_fields = ('client_name', 'client_email', 'client_phone', 'service_name')
+    date_hierarchy = 'appointment_date'
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+@admin.register(CalendarFeed)
+class CalendarFeedAdmin(admin.ModelAdmin):
+    # Deleting a feed revokes its URL; the owner gets a new one from the dashboard
+    list_display = ('user', 'token_updated_at')
+    search_fields = ('user__username',)
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
 @admin.register(WorkingHours)
 class WorkingHoursAdmin(admin.ModelAdmin):
     list_display = ('day_of_week', 'start_time', 'end_time', 'is_working')
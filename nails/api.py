@@ -0,0 +1,199 @@
+import base64
+import json
+from datetime import date
+from functools import wraps
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max, Q, Sum
+from django.http import JsonResponse
+from django.utils import timezone
+
+from .signals import availability_version
+
+# Public field name -> ORM lookup passed to .values()
+APPOINTMENT_FIELDS = {
+    'id': 'id',
+    'client_name': 'client_name',
+    'client_email': 'client_email',
+    'client_phone': 'client_phone',
+    'service': 'service_id',
+    'service_name': 'service__name',
+    'date': 'appointment_date',
+    'time': 'appointment_time',
+    'duration': 'duration',
+    'status': 'status',
+    'special_requests': 'special_requests',
+    'created_at': 'created_at',
+}
+APPOINTMENT_ORDERING = ['appointment_date', 'appointment_time', 'id']
+
+CLIENT_FIELDS = {
+    'name': 'client_name',
+    'email': 'client_email',
+    'phone': 'client_phone',
+    'appointments': 'appointments',
+    'last_appointment': 'last_appointment',
+}
+CLIENT_AGGREGATES = {
+    'appointments': Count('id'),
+    'last_appointment': Max('appointment_date'),
+}
+CLIENT_ORDERING = ['client_email', 'client_name', 'client_phone']
+
+SERVICE_FIELDS = {
+    'id': 'id',
+    'name': 'name',
+    'description': 'description',
+    'price': 'price',
+    'duration': 'duration',
+    'is_active': 'is_active',
+}
+SERVICE_ORDERING = ['id']
+
+
+def stat_aggregates(today):
+    """Every stat the API offers, as aggregates over the appointment table"""
+    active = Q(status__in=['PENDING', 'CONFIRMED'])
+    return {
+        'total': Count('id'),
+        'pending': Count('id', filter=Q(status='PENDING')),
+        'confirmed': Count('id', filter=Q(status='CONFIRMED')),
+        'completed': Count('id', filter=Q(status='COMPLETED')),
+        'cancelled': Count('id', filter=Q(status='CANCELLED')),
+        'no_show': Count('id', filter=Q(status='NO_SHOW')),
+        'today': Count('id', filter=active & Q(appointment_date=today)),
+        'upcoming': Count('id', filter=active & Q(appointment_date__gte=today)),
+        'revenue': Sum('service__price', filter=Q(status='COMPLETED')),
+    }
+
+
+class ApiError(Exception):
+    """Bad query parameters; turned into a 400 JSON response by ``api_view``"""
+
+
+def json_response(data, status=200):
+    """Compact JSON: no whitespace, dates/times/decimals as ISO strings"""
+    response = JsonResponse(data, status=status, json_dumps_params={'separators': (',', ':')})
+    # Let the browser and service worker keep a copy but revalidate it with the ETag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def api_view(view_func):
+    """Require a logged-in user (401 rather than a login redirect) and report ApiError as 400"""
+    @wraps(view_func)
+    def _wrapped(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return json_response({'error': 'Authentication required.'}, status=401)
+        try:
+            return view_func(request, *args, **kwargs)
+        except ApiError as e:
+            return json_response({'error': str(e)}, status=400)
+    return _wrapped
+
+
+def data_etag(request, *args, **kwargs):
+    """Changes whenever an appointment, service or working hours change, and daily.
+
+    Reuses the availability version the signals already bump, so checking it
+    costs one primary-key lookup of the counter row.
+    """
+    if not request.user.is_authenticated:
+        return None
+    return f"api-{availability_version()}-{timezone.now().date()}"
+
+
+def parse_fields(request, available):
+    """Names from ``?fields=a,b``, in request order; every field when absent"""
+    fields = [name.strip() for name in request.GET.get('fields', '').split(',') if name.strip()]
+    if not fields:
+        return list(available)
+    unknown = [name for name in fields if name not in available]
+    if unknown:
+        raise ApiError(f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(available)}")
+    return list(dict.fromkeys(fields))
+
+
+def parse_limit(request):
+    try:
+        limit = int(request.GET.get('limit', settings.NAILS_API_PAGE_SIZE))
+    except ValueError:
+        raise ApiError("limit must be an integer")
+    if limit < 1:
+        raise ApiError("limit must be at least 1")
+    return min(limit, settings.NAILS_API_MAX_PAGE_SIZE)
+
+
+def parse_date(request, name):
+    value = request.GET.get(name)
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ApiError(f"{name} must be a date like 2025-01-31")
+
+
+def encode_cursor(values):
+    raw = json.dumps([str(value) for value in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, model, ordering):
+    """The ordering values in ``cursor``, converted with each field's ``to_python``"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise ApiError("Invalid cursor")
+    if (not isinstance(values, list) or len(values) != len(ordering)
+            or not all(isinstance(value, str) for value in values)):
+        raise ApiError("Invalid cursor")
+    try:
+        return [model._meta.get_field(field).to_python(value) for field, value in zip(ordering, values)]
+    except (ValidationError, ValueError):
+        raise ApiError("Invalid cursor")
+
+
+def keyset_filter(ordering, values):
+    """Rows strictly after ``values`` in ascending ``ordering``.
+
+    For (a, b, c) this is ``a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z)``,
+    which lets the database seek straight to the page instead of counting
+    past an OFFSET.
+    """
+    condition = Q()
+    for i, field in enumerate(ordering):
+        equal = {ordering[j]: values[j] for j in range(i)}
+        condition |= Q(**equal, **{f'{field}__gt': values[i]})
+    return condition
+
+
+def paginate_values(request, queryset, fields, selected, ordering):
+    """One keyset page of ``selected`` fields, serialized straight from ``.values()``.
+
+    Rows come back as dicts, so no model instances are built. The ordering
+    columns are always fetched so the next cursor can be made from the last
+    row, even when the client didn't ask for them.
+    """
+    limit = parse_limit(request)
+    queryset = queryset.order_by(*ordering)
+    cursor = request.GET.get('cursor')
+    if cursor:
+        queryset = queryset.filter(keyset_filter(ordering, decode_cursor(cursor, queryset.model, ordering)))
+
+    lookups = list(dict.fromkeys([fields[name] for name in selected] + ordering))
+    rows = list(queryset.values(*lookups)[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_url = None
+    if has_more:
+        params = request.GET.copy()
+        params['cursor'] = encode_cursor([rows[-1][field] for field in ordering])
+        next_url = f"{request.path}?{params.urlencode()}"
+
+    return {
+        'results': [{name: row[fields[name]] for name in selected} for row in rows],
+        'next': next_url,
+    }
@@ -0,0 +1,111 @@
+from datetime import timedelta
+
+from django.db import router, transaction
+from django.utils import timezone
+
+from .models import Appointment, ArchivedAppointment
+from .signals import appointments_archived
+
+ARCHIVABLE_STATUSES = ['COMPLETED', 'CANCELLED', 'NO_SHOW']
+
+
+def archivable_appointments(cutoff):
+    """Finished appointments dated before ``cutoff``"""
+    return Appointment.objects.filter(
+        appointment_date__lt=cutoff,
+        status__in=ARCHIVABLE_STATUSES,
+    )
+
+
+def archive_batch(cutoff, batch_size):
+    """Move one batch into the archive table; returns how many rows moved.
+
+    An id that is already archived raises IntegrityError and rolls the whole
+    batch back, rather than deleting a live row that was never copied.
+    """
+    with transaction.atomic():
+        batch = list(
+            archivable_appointments(cutoff)
+            .select_related('service')
+            .select_for_update(skip_locked=True, of=('self',))
+            .order_by('id')[:batch_size]
+        )
+        if not batch:
+            return 0
+        ArchivedAppointment.objects.bulk_create([
+            ArchivedAppointment(
+                id=appointment.id,
+                client_name=appointment.client_name,
+                client_email=appointment.client_email,
+                client_phone=appointment.client_phone,
+                service=appointment.service,
+                service_name=appointment.service.name,
+                service_price=appointment.service.price,
+                appointment_date=appointment.appointment_date,
+                appointment_time=appointment.appointment_time,
+                duration=appointment.duration,
+                special_requests=appointment.special_requests,
+                status=appointment.status,
+                created_at=appointment.created_at,
+            )
+            for appointment in batch
+        ])
+        ids = [appointment.id for appointment in batch]
+        # A plain delete() would fire post_delete (cache bumps and a live
+        # event) once per row; nothing references Appointment, so delete
+        # the rows directly and send one signal for the whole batch.
+        Appointment.objects.filter(id__in=ids)._raw_delete(router.db_for_write(Appointment))
+        appointments_archived.send(sender=Appointment, ids=ids)
+    return len(batch)
+
+
+def archive_appointments(older_than_days=365, batch_size=1000, max_batches=None):
+    """Archive finished appointments in batches, yielding each batch's size"""
+    cutoff = timezone.now().date() - timedelta(days=older_than_days)
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        moved = archive_batch(cutoff, batch_size)
+        if not moved:
+            break
+        batches += 1
+        yield moved
+
+
+class ChainedResults:
+    """Sequence over live then archived results, for Paginator and exports.
+
+    Live appointments are listed first, then archived ones; each part keeps
+    its own ordering and only the rows for the requested page are fetched.
+    """
+
+    def __init__(self, *querysets):
+        self.querysets = querysets
+        self._counts = None
+
+    def counts(self):
+        if self._counts is None:
+            self._counts = [qs.count() for qs in self.querysets]
+        return self._counts
+
+    def count(self):
+        return sum(self.counts())
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            raise TypeError("ChainedResults only supports slicing")
+        start = index.start or 0
+        stop = self.count() if index.stop is None else index.stop
+        results = []
+        for qs, count in zip(self.querysets, self.counts()):
+            if start < count and stop > 0:
+                results.extend(qs[max(start, 0):min(stop, count)])
+            start -= count
+            stop -= count
+        return results
+
+    def iterator(self, chunk_size=2000):
+        for qs in self.querysets:
+            yield from qs.iterator(chunk_size=chunk_size)
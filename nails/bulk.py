@@ -0,0 +1,42 @@
+from django.db import transaction
+
+from .models import Appointment
+from .signals import appointments_status_changed
+
+BULK_STATUSES = ['CONFIRMED', 'COMPLETED', 'CANCELLED', 'NO_SHOW']
+
+
+def allowed_sources(new_status):
+    """Statuses an appointment may be in to move to ``new_status``"""
+    return [
+        status for status, targets in Appointment.STATUS_TRANSITIONS.items()
+        if new_status in targets
+    ]
+
+
+def bulk_update_status(ids, new_status):
+    """Move the given appointments to ``new_status`` with a single UPDATE.
+
+    Appointments whose current status doesn't allow the transition are left
+    alone. Returns ``(updated_ids, skipped_count)`` and sends one
+    ``appointments_status_changed`` signal for the whole batch.
+    """
+    if new_status not in BULK_STATUSES:
+        raise ValueError(f"Unsupported bulk status: {new_status}")
+    ids = set(ids)
+    if not ids:
+        return [], 0
+
+    with transaction.atomic():
+        updated_ids = list(
+            Appointment.objects.select_for_update()
+            .filter(id__in=ids, status__in=allowed_sources(new_status))
+            .order_by()
+            .values_list('id', flat=True)
+        )
+        if updated_ids:
+            Appointment.objects.filter(id__in=updated_ids).update(status=new_status)
+            appointments_status_changed.send(
+                sender=Appointment, ids=updated_ids, status=new_status,
+            )
+    return updated_ids, len(ids) - len(updated_ids)
@@ -0,0 +1,73 @@
+import threading
+import time
+
+from django.core.cache import cache
+
+_MISSING = object()
+_local_lock = threading.Lock()
+_in_flight = {}
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def coalesce(key, compute, ttl=5, lock_timeout=10, wait=2.0):
+    """Return ``compute()`` for ``key``, sharing one computation between callers.
+
+    Threads in the same worker wait on the first caller's result. Across
+    workers a short-lived cache lock makes the others poll for the cached
+    result instead of recomputing, falling back to computing themselves if
+    it doesn't show up within ``wait`` seconds. Results are cached for
+    ``ttl`` seconds.
+    """
+    cached = cache.get(key, _MISSING)
+    if cached is not _MISSING:
+        return cached
+
+    with _local_lock:
+        flight = _in_flight.get(key)
+        leader = flight is None
+        if leader:
+            flight = _in_flight[key] = _Flight()
+
+    if not leader:
+        flight.done.wait(lock_timeout)
+        if flight.error is not None:
+            raise flight.error
+        if flight.done.is_set():
+            return flight.result
+        return compute()
+
+    try:
+        flight.result = _compute_across_workers(key, compute, ttl, lock_timeout, wait)
+        return flight.result
+    except Exception as e:
+        flight.error = e
+        raise
+    finally:
+        flight.done.set()
+        with _local_lock:
+            _in_flight.pop(key, None)
+
+
+def _compute_across_workers(key, compute, ttl, lock_timeout, wait):
+    lock_key = f"{key}:lock"
+    if cache.add(lock_key, 1, timeout=lock_timeout):
+        try:
+            result = compute()
+            cache.set(key, result, timeout=ttl)
+            return result
+        finally:
+            cache.delete(lock_key)
+
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        time.sleep(0.02)
+        cached = cache.get(key, _MISSING)
+        if cached is not _MISSING:
+            return cached
+    return compute()
@@ -0,0 +1,27 @@
+import time
+
+from django.db.models import F
+
+from .models import Counter
+
+
+def initial_value():
+    """Milliseconds since the epoch, so a counter that is recreated never repeats a value"""
+    return time.time_ns() // 1_000_000
+
+
+def get_counter(name):
+    value = Counter.objects.filter(name=name).values_list('value', flat=True).first()
+    if value is None:
+        value = Counter.objects.get_or_create(name=name, defaults={'value': initial_value()})[0].value
+    return value
+
+
+def bump_counter(name):
+    """Increment ``name`` in a single UPDATE.
+
+    Inside a transaction the new value only becomes visible when the
+    transaction commits, together with the change it stands for.
+    """
+    if not Counter.objects.filter(name=name).update(value=F('value') + 1):
+        Counter.objects.get_or_create(name=name, defaults={'value': initial_value()})
@@ -1,6 +1,12 @@
 from django.core.mail import send_mail
 from django.template.loader import render_to_string
 from django.conf import settings
+import logging
+import time
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
 
 def send_appointment_confirmation(appointment):
     """Send confirmation email to client"""
@@ -30,6 +36,7 @@ def send_appointment_confirmation(appointment):
     The Elegant Nails Team
     """
     
+    start = time.perf_counter()
     try:
         send_mail(
             subject,
@@ -39,9 +46,11 @@ def send_appointment_confirmation(appointment):
             html_message=html_message,
             fail_silently=False,
         )
+        metrics.observe_email('confirmation', time.perf_counter() - start, True)
         return True
     except Exception as e:
-        print(f"Error sending confirmation email: {e}")
+        metrics.observe_email('confirmation', time.perf_counter() - start, False)
+        logger.exception("Error sending confirmation email: %s", e)
         return False
 
 def send_admin_notification(appointment):
@@ -66,6 +75,7 @@ def send_admin_notification(appointment):
     Special Requests: {appointment.special_requests or 'None'}
     """
     
+    start = time.perf_counter()
     try:
         # Send to your brother's email - replace with his actual email
         admin_email = 'jnlearner22@gmail.com@email.com'  # CHANGE THIS!
@@ -78,7 +88,9 @@ def send_admin_notification(appointment):
             html_message=html_message,
             fail_silently=False,
         )
+        metrics.observe_email('admin_notification', time.perf_counter() - start, True)
         return True
     except Exception as e:
-        print(f"Error sending admin notification: {e}")
+        metrics.observe_email('admin_notification', time.perf_counter() - start, False)
+        logger.exception("Error sending admin notification: %s", e)
         return False
\ No newline at end of file
@@ -0,0 +1,102 @@
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from .counters import initial_value
+from .models import Appointment
+
+SEQUENCE_KEY = 'events:seq'
+EVENT_KEY = 'events:{}'
+
+
+def publish(event_type, data):
+    """Append an event to the cache-backed log every worker's streams read.
+
+    The log is a sequence counter plus one short-lived key per event. It
+    needs the shared cache (Redis), whose ``incr`` is atomic; without one
+    nothing is published and the dashboard doesn't stream.
+    """
+    if not settings.NAILS_SHARED_CACHE:
+        return None
+    try:
+        seq = cache.incr(SEQUENCE_KEY)
+    except ValueError:
+        # Lost (evicted or flushed): start past any id a stream may still hold
+        cache.add(SEQUENCE_KEY, initial_value(), timeout=None)
+        seq = cache.incr(SEQUENCE_KEY)
+    cache.set(EVENT_KEY.format(seq), {'id': seq, 'type': event_type, 'data': data},
+              timeout=settings.NAILS_EVENT_TTL)
+    return seq
+
+
+# Django's cache backends have no native async methods: cache.aget() runs
+# on the single thread that also serves every sync view under ASGI. Each
+# open dashboard polls, so run the reads on the thread pool instead.
+_get = sync_to_async(cache.get, thread_sensitive=False)
+_get_many = sync_to_async(cache.get_many, thread_sensitive=False)
+
+
+async def read_events(after):
+    """Events newer than ``after``, oldest first; gaps from expired keys are skipped"""
+    latest = await _get(SEQUENCE_KEY, 0)
+    if latest <= after:
+        return latest, []
+    first = max(after + 1, latest - settings.NAILS_EVENT_BACKLOG + 1)
+    keys = [EVENT_KEY.format(seq) for seq in range(first, latest + 1)]
+    found = await _get_many(keys)
+    return latest, [found[key] for key in keys if key in found]
+
+
+def format_sse(event):
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event['data'])}\n\n"
+
+
+async def stream(last_event_id=None):
+    """Yield SSE messages for new events, with periodic heartbeats.
+
+    Each stream costs one cache read per ``NAILS_EVENT_POLL_SECONDS``, which
+    is only cheap with Redis; ``dashboard_events`` doesn't stream without it.
+    """
+    seq = last_event_id if last_event_id is not None else await _get(SEQUENCE_KEY, 0)
+    yield "retry: 5000\n\n"
+    idle = 0.0
+    while True:
+        seq, events = await read_events(seq)
+        for event in events:
+            yield format_sse(event)
+        if events:
+            idle = 0.0
+        else:
+            idle += settings.NAILS_EVENT_POLL_SECONDS
+            if idle >= 15:
+                idle = 0.0
+                yield ": keep-alive\n\n"
+        await asyncio.sleep(settings.NAILS_EVENT_POLL_SECONDS)
+
+
+def appointment_stats():
+    """Dashboard counters in one aggregate query"""
+    return Appointment.objects.aggregate(
+        total=Count('id'),
+        pending=Count('id', filter=Q(status='PENDING')),
+        confirmed=Count('id', filter=Q(status='CONFIRMED')),
+        completed=Count('id', filter=Q(status='COMPLETED')),
+    )
+
+
+def appointment_payload(appointment):
+    return {
+        'id': appointment.id,
+        'client_name': appointment.client_name,
+        'client_phone': appointment.client_phone,
+        'service': appointment.service.name,
+        'date': str(appointment.appointment_date),
+        'time': str(appointment.appointment_time)[:5],
+        'status': appointment.status,
+        'status_display': appointment.get_status_display(),
+        'special_requests': appointment.special_requests,
+    }
@@ -0,0 +1,130 @@
+import secrets
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Appointment, CalendarFeed
+
+VEVENT_KEY = 'ics:vevent:{}'
+
+ICS_STATUS = {
+    'PENDING': 'TENTATIVE',
+    'CONFIRMED': 'CONFIRMED',
+    'COMPLETED': 'CONFIRMED',
+    'CANCELLED': 'CANCELLED',
+    'NO_SHOW': 'CANCELLED',
+}
+
+
+def feed_token(user):
+    feed, _ = CalendarFeed.objects.get_or_create(
+        user=user, defaults={'token': secrets.token_urlsafe(32)},
+    )
+    return feed.token
+
+
+def reset_feed_token(user):
+    """Give the user a new feed URL; calendars subscribed to the old one stop updating"""
+    token = secrets.token_urlsafe(32)
+    CalendarFeed.objects.update_or_create(user=user, defaults={'token': token})
+    return token
+
+
+def user_for_token(token):
+    """The active staff member a feed token belongs to, or None"""
+    feed = (
+        CalendarFeed.objects.select_related('user')
+        .filter(token=token, user__is_active=True, user__is_staff=True)
+        .first()
+    )
+    return feed.user if feed else None
+
+
+def invalidate_events(ids):
+    """Drop cached VEVENTs; feed ETags follow the availability version"""
+    cache.delete_many([VEVENT_KEY.format(appointment_id) for appointment_id in ids])
+
+
+def escape_text(value):
+    return (
+        str(value).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n')
+    )
+
+
+def fold(line):
+    """Fold a content line at 75 octets as RFC 5545 requires"""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line
+    parts = []
+    limit = 75
+    while encoded:
+        cut = min(limit, len(encoded))
+        # Don't split a multi-byte character
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode('utf-8'))
+        encoded = encoded[cut:]
+        limit = 74
+    return '\r\n '.join(parts)
+
+
+def render_vevent(appointment):
+    """One VEVENT block; times are floating so they show as salon-local time"""
+    start = datetime.combine(appointment.appointment_date, appointment.appointment_time)
+    end = start + timedelta(minutes=appointment.duration)
+    stamp = appointment.created_at.astimezone(dt_timezone.utc)
+    description = (
+        f"Phone: {appointment.client_phone}\n"
+        f"Email: {appointment.client_email}\n"
+        f"Status: {appointment.get_status_display()}"
+    )
+    if appointment.special_requests:
+        description += f"\nNotes: {appointment.special_requests}"
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:appointment-{appointment.id}@elegantnails',
+        f'DTSTAMP:{stamp:%Y%m%dT%H%M%SZ}',
+        f'DTSTART:{start:%Y%m%dT%H%M%S}',
+        f'DTEND:{end:%Y%m%dT%H%M%S}',
+        f'SUMMARY:{escape_text(f"{appointment.client_name} - {appointment.service.name}")}',
+        f'DESCRIPTION:{escape_text(description)}',
+        f'STATUS:{ICS_STATUS[appointment.status]}',
+        'END:VEVENT',
+    ]
+    return '\r\n'.join(fold(line) for line in lines) + '\r\n'
+
+
+def build_feed(queryset):
+    """Assemble the calendar from cached VEVENTs, rendering only the misses.
+
+    VEVENTs are only cached in a shared cache: a per-worker copy would miss
+    invalidations made by other workers.
+    """
+    ids = list(queryset.values_list('id', flat=True))
+    keys = {appointment_id: VEVENT_KEY.format(appointment_id) for appointment_id in ids}
+    cached = cache.get_many(keys.values()) if settings.NAILS_SHARED_CACHE else {}
+
+    missing = [appointment_id for appointment_id in ids if keys[appointment_id] not in cached]
+    if missing:
+        rendered = {}
+        for appointment in Appointment.objects.filter(id__in=missing).select_related('service'):
+            rendered[keys[appointment.id]] = render_vevent(appointment)
+        if settings.NAILS_SHARED_CACHE:
+            cache.set_many(rendered, timeout=settings.NAILS_CALENDAR_CACHE_SECONDS)
+        cached.update(rendered)
+
+    parts = [
+        'BEGIN:VCALENDAR\r\n',
+        'VERSION:2.0\r\n',
+        'PRODID:-//Elegant Nails//Appointments//EN\r\n',
+        'CALSCALE:GREGORIAN\r\n',
+        'METHOD:PUBLISH\r\n',
+        'X-WR-CALNAME:Elegant Nails Appointments\r\n',
+        'REFRESH-INTERVAL;VALUE=DURATION:PT5M\r\n',
+    ]
+    parts.extend(cached[keys[appointment_id]] for appointment_id in ids if keys[appointment_id] in cached)
+    parts.append('END:VCALENDAR\r\n')
+    return ''.join(parts)
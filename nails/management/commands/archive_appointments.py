@@ -0,0 +1,47 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+from django.utils import timezone
+
+from nails.archiving import archivable_appointments, archive_appointments
+
+
+class Command(BaseCommand):
+    help = "Move old completed and cancelled appointments into the archive table in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int, default=365,
+                            help="Archive finished appointments dated more than this many days ago")
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--max-batches', type=int, help="Stop after this many batches")
+        parser.add_argument('--dry-run', action='store_true', help="Only report how many rows would move")
+
+    def handle(self, *args, **options):
+        if options['older_than_days'] < 1:
+            raise CommandError("--older-than-days must be at least 1")
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1")
+
+        if options['dry_run']:
+            cutoff = timezone.now().date() - timedelta(days=options['older_than_days'])
+            count = archivable_appointments(cutoff).count()
+            self.stdout.write(f"{count} appointments dated before {cutoff} would be archived")
+            return
+
+        total = 0
+        try:
+            for moved in archive_appointments(
+                older_than_days=options['older_than_days'],
+                batch_size=options['batch_size'],
+                max_batches=options['max_batches'],
+            ):
+                total += moved
+                self.stdout.write(f"Archived {moved} appointments ({total} so far)")
+        except IntegrityError as e:
+            raise CommandError(
+                f"Stopped after archiving {total} appointments: a batch contains an appointment "
+                f"that is already archived, so it was left in place ({e})"
+            )
+
+        self.stdout.write(self.style.SUCCESS(f"Archived {total} appointments"))
@@ -0,0 +1,250 @@
+import json
+import platform
+import statistics
+import subprocess
+import time
+from contextlib import ExitStack
+from datetime import timedelta
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from nails.middleware import QueryRecorder
+from nails.models import Appointment, Service
+from nails.seeding import clear_salon, seed_salon
+
+# A private in-memory cache, so seeding and benchmarking never bump versions,
+# publish events or set rate limits in the configured one
+BENCH_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'bench-salon',
+    }
+}
+
+BENCHMARKS = [
+    'get_available_times',
+    'book_appointment',
+    'dashboard',
+    'appointment_list_search',
+    'client_list',
+    'analytics',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the booking and dashboard views against seeded datasets of several sizes "
+        "and write JSON results that can be compared between commits. Runs against a "
+        "throwaway test database, never the configured one."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,10000,50000',
+                            help="Comma-separated appointment counts to benchmark")
+        parser.add_argument('--repeat', type=int, default=20, help="Timed runs per benchmark")
+        parser.add_argument('--warmup', type=int, default=3, help="Untimed runs per benchmark")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--only', help="Comma-separated subset of: " + ', '.join(BENCHMARKS))
+        parser.add_argument('--output', help="Write JSON results to this file")
+        parser.add_argument('--compare', help="Previous JSON results to compare against")
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options['sizes'].split(',') if size]
+        except ValueError:
+            raise CommandError("--sizes must be a comma-separated list of integers")
+        benchmarks = BENCHMARKS
+        if options['only']:
+            benchmarks = [name.strip() for name in options['only'].split(',')]
+            unknown = set(benchmarks) - set(BENCHMARKS)
+            if unknown:
+                raise CommandError(f"Unknown benchmarks: {', '.join(sorted(unknown))}")
+
+        setup_test_environment()
+        # Measure the views themselves, not the rate limiter, result cache or replica
+        overrides = override_settings(
+            CACHES=BENCH_CACHES,
+            # The manifest only exists after collectstatic
+            STORAGES={**settings.STORAGES, 'staticfiles': {
+                'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+            }},
+            NAILS_RATELIMIT_ENABLED=False,
+            NAILS_AVAILABILITY_CACHE_SECONDS=0,
+            NAILS_REPLICA_VIEWS=[],
+        )
+        overrides.enable()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            results = {}
+            for size in sizes:
+                self.stdout.write(f"Seeding {size} appointments...")
+                clear_salon()
+                seed_salon(appointments=size, seed=options['seed'])
+                results[str(size)] = self.run_size(benchmarks, options['repeat'], options['warmup'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            overrides.disable()
+            teardown_test_environment()
+
+        report = {
+            'commit': self.git_commit(),
+            'created_at': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'repeat': options['repeat'],
+            'seed': options['seed'],
+            'results': results,
+        }
+        self.print_report(report)
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+        if options['compare']:
+            with open(options['compare']) as f:
+                self.print_comparison(json.load(f), report)
+
+    def run_size(self, benchmarks, repeat, warmup):
+        user = User.objects.filter(username='bench').first()
+        if user is None:
+            user = User.objects.create_superuser('bench', 'bench@example.com', 'bench')
+        staff = Client(HTTP_HOST='localhost')
+        staff.force_login(user)
+        public = Client(HTTP_HOST='localhost')
+
+        service = Service.objects.filter(is_active=True).order_by('id').first()
+        tomorrow = timezone.now().date() + timedelta(days=1)
+        availability_date = (
+            Appointment.objects.filter(appointment_date__gte=tomorrow)
+            .values_list('appointment_date', flat=True)
+            .order_by('appointment_date')
+            .first()
+        ) or tomorrow
+        search_term = Appointment.objects.values_list('client_name', flat=True).first().split()[-1]
+        booking_dates = self.booking_dates()
+
+        def book(i):
+            day = booking_dates[i % len(booking_dates)]
+            return public.post('/book/', {
+                'client_name': 'Bench Client',
+                'client_email': 'bench@example.com',
+                'client_phone': '555-000-0000',
+                'service': service.id,
+                'appointment_date_year': day.year,
+                'appointment_date_month': day.month,
+                'appointment_date_day': day.day,
+                'appointment_time': f'{9 + i % 8:02d}:00',
+                'special_requests': '',
+            }, secure=True)
+
+        requests = {
+            'get_available_times': lambda i: public.get(
+                '/get-available-times/',
+                {'date': availability_date.isoformat(), 'service_id': service.id}, secure=True,
+            ),
+            'book_appointment': book,
+            'dashboard': lambda i: staff.get('/dashboard/', secure=True),
+            'appointment_list_search': lambda i: staff.get(
+                '/dashboard/appointments/', {'search': search_term}, secure=True,
+            ),
+            'client_list': lambda i: staff.get('/dashboard/clients/', secure=True),
+            'analytics': lambda i: staff.get('/dashboard/analytics/', secure=True),
+        }
+
+        results = {}
+        for name in benchmarks:
+            results[name] = self.time_requests(name, requests[name], repeat, warmup)
+        return results
+
+    def booking_dates(self):
+        """Future Monday-Saturday dates the booking form's year widget accepts"""
+        today = timezone.now().date()
+        dates = []
+        day = today + timedelta(days=1)
+        while len(dates) < 60 and day.year <= today.year + 1:
+            if day.weekday() != 6:
+                dates.append(day)
+            day += timedelta(days=1)
+        return dates
+
+    def time_requests(self, name, request, repeat, warmup):
+        for i in range(warmup):
+            self.check_response(name, request(i))
+
+        timings = []
+        queries = []
+        for i in range(warmup, warmup + repeat):
+            recorder = QueryRecorder()
+            with ExitStack() as stack:
+                for conn in connections.all():
+                    stack.enter_context(conn.execute_wrapper(recorder))
+                start = time.perf_counter()
+                response = request(i)
+                timings.append((time.perf_counter() - start) * 1000)
+            self.check_response(name, response)
+            queries.append(recorder.count)
+
+        timings.sort()
+        return {
+            'median_ms': round(statistics.median(timings), 3),
+            'mean_ms': round(statistics.mean(timings), 3),
+            'min_ms': round(timings[0], 3),
+            'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+            'queries': round(statistics.mean(queries), 1),
+        }
+
+    def check_response(self, name, response):
+        if response.status_code >= 400:
+            raise CommandError(f"{name} returned HTTP {response.status_code}")
+
+    def git_commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+                capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def print_report(self, report):
+        self.stdout.write(f"\nCommit {report['commit']} on {report['database']}")
+        for size, benches in report['results'].items():
+            self.stdout.write(f"\n{size} appointments")
+            for name, result in benches.items():
+                self.stdout.write(
+                    f"  {name:<26} median {result['median_ms']:>9.2f} ms   "
+                    f"p95 {result['p95_ms']:>9.2f} ms   queries {result['queries']:>6}"
+                )
+
+    def print_comparison(self, old, new):
+        self.stdout.write(f"\nCompared with {old.get('commit')} (median ms)")
+        for size, benches in new['results'].items():
+            old_benches = old.get('results', {}).get(size)
+            if not old_benches:
+                continue
+            self.stdout.write(f"\n{size} appointments")
+            for name, result in benches.items():
+                before = old_benches.get(name)
+                if not before:
+                    continue
+                change = (result['median_ms'] - before['median_ms']) / before['median_ms'] * 100
+                line = (
+                    f"  {name:<26} {before['median_ms']:>9.2f} -> {result['median_ms']:>9.2f} "
+                    f"({change:+.1f}%)   queries {before['queries']} -> {result['queries']}"
+                )
+                if change > 10:
+                    line = self.style.ERROR(line)
+                elif change < -10:
+                    line = self.style.SUCCESS(line)
+                self.stdout.write(line)
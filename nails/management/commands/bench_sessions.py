@@ -0,0 +1,186 @@
+import statistics
+from contextlib import ExitStack
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from nails.middleware import QueryRecorder
+from nails.models import Appointment, Service
+from nails.seeding import seed_salon
+
+CONFIGURATIONS = {
+    'before': {
+        'SESSION_ENGINE': 'django.contrib.sessions.backends.db',
+        'MESSAGE_STORAGE': 'django.contrib.messages.storage.fallback.FallbackStorage',
+    },
+    'after': {
+        'SESSION_ENGINE': 'nails.sessions',
+        'MESSAGE_STORAGE': 'nails.message_storage.MessageStorage',
+    },
+}
+# A private in-memory cache stands in for Redis, so the benchmark never
+# reads, writes or flushes the configured one
+BENCH_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'bench-sessions',
+    }
+}
+
+
+class SessionQueryRecorder(QueryRecorder):
+    """Also count the queries that touch ``django_session``"""
+
+    def __init__(self):
+        super().__init__()
+        self.session_reads = 0
+        self.session_writes = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        if 'django_session' in sql:
+            if sql.lstrip().upper().startswith('SELECT'):
+                self.session_reads += 1
+            else:
+                self.session_writes += 1
+        return super().__call__(execute, sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = (
+        "Count DB round trips per request for the public booking flow and the staff "
+        "dashboard, with Django's default session/message storage ('before') and the "
+        "configured cache-backed storage ('after'). Runs against a throwaway test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5, help="Times to run each flow")
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError("--repeat must be at least 1")
+
+        self.next_booking_day = timezone.now().date() + timedelta(days=30)
+        setup_test_environment()
+        overrides = override_settings(
+            CACHES=BENCH_CACHES,
+            # The manifest only exists after collectstatic
+            STORAGES={**settings.STORAGES, 'staticfiles': {
+                'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+            }},
+            NAILS_RATELIMIT_ENABLED=False,
+            NAILS_REPLICA_VIEWS=[],
+        )
+        overrides.enable()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            seed_salon(appointments=200, seed=options['seed'])
+            User.objects.create_superuser('bench', 'bench@example.com', 'bench')
+            results = {}
+            for name, config in CONFIGURATIONS.items():
+                cache.clear()
+                with override_settings(**config):
+                    results[name] = self.run_flows(options['repeat'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            overrides.disable()
+            teardown_test_environment()
+
+        self.print_report(results)
+
+    def run_flows(self, repeat):
+        steps = {}
+        for i in range(repeat):
+            for flow in (self.public_flow(i), self.staff_flow(i)):
+                for label, request in flow:
+                    recorder = SessionQueryRecorder()
+                    with ExitStack() as stack:
+                        for conn in connections.all():
+                            stack.enter_context(conn.execute_wrapper(recorder))
+                        response = request()
+                    if response.status_code >= 400:
+                        raise CommandError(f"{label} returned HTTP {response.status_code}")
+                    steps.setdefault(label, []).append(recorder)
+        return {
+            label: {
+                'queries': round(statistics.mean(r.count for r in recorders), 1),
+                'session_reads': round(statistics.mean(r.session_reads for r in recorders), 1),
+                'session_writes': round(statistics.mean(r.session_writes for r in recorders), 1),
+            }
+            for label, recorders in steps.items()
+        }
+
+    def public_flow(self, i):
+        client = Client(HTTP_HOST='localhost')
+        service = Service.objects.filter(is_active=True).order_by('id').first()
+        # A fresh open day per booking, across both configurations, so every
+        # POST is a real booking rather than a "slot taken" re-render
+        day = self.next_booking_day
+        while day.weekday() == 6:
+            day += timedelta(days=1)
+        self.next_booking_day = day + timedelta(days=1)
+        booking = {
+            'client_name': 'Bench Client',
+            'client_email': 'bench@example.com',
+            'client_phone': '555-000-0000',
+            'service': service.id,
+            'appointment_date_year': day.year,
+            'appointment_date_month': day.month,
+            'appointment_date_day': day.day,
+            'appointment_time': '10:00',
+            'special_requests': '',
+        }
+        return [
+            ('public: GET /book/', lambda: client.get('/book/', secure=True)),
+            ('public: POST /book/', lambda: client.post('/book/', booking, secure=True)),
+            ('public: GET /', lambda: client.get('/', secure=True)),
+        ]
+
+    def staff_flow(self, i):
+        client = Client(HTTP_HOST='localhost')
+        appointment_id = Appointment.objects.order_by('id').values_list('id', flat=True)[i]
+        status_url = f'/dashboard/appointments/{appointment_id}/update-status/'
+        return [
+            ('staff: POST /login/', lambda: client.post(
+                '/login/', {'username': 'bench', 'password': 'bench'}, secure=True,
+            )),
+            ('staff: GET /dashboard/', lambda: client.get('/dashboard/', secure=True)),
+            ('staff: POST update-status', lambda: client.post(
+                status_url, {'status': 'CONFIRMED'}, secure=True,
+                HTTP_REFERER='/dashboard/appointments/',
+            )),
+            ('staff: GET /dashboard/appointments/', lambda: client.get(
+                '/dashboard/appointments/', secure=True,
+            )),
+            ('staff: GET /dashboard/clients/', lambda: client.get('/dashboard/clients/', secure=True)),
+        ]
+
+    def print_report(self, results):
+        before, after = results['before'], results['after']
+        self.stdout.write(
+            f"\n{'step':<38} {'queries':>15}   {'session reads':>15}   "
+            f"{'session writes':>15}"
+        )
+        for label in before:
+            old, new = before[label], after[label]
+            self.stdout.write(
+                f"{label:<38} "
+                f"{old['queries']:>6} -> {new['queries']:<6}   "
+                f"{old['session_reads']:>6} -> {new['session_reads']:<6}   "
+                f"{old['session_writes']:>6} -> {new['session_writes']:<6}"
+            )
+        totals = {
+            name: sum(step['queries'] for step in steps.values())
+            for name, steps in results.items()
+        }
+        self.stdout.write(self.style.SUCCESS(
+            f"\nQueries per pass through both flows: {totals['before']} -> {totals['after']}"
+        ))
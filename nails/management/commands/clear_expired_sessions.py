@@ -0,0 +1,32 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from nails.sessions import SessionStore
+
+
+class Command(BaseCommand):
+    help = "Delete expired sessions from the database in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.NAILS_SESSION_CLEANUP_BATCH_SIZE)
+        parser.add_argument('--max-batches', type=int, help="Stop after this many batches")
+        parser.add_argument('--sleep', type=float, default=0,
+                            help="Seconds to pause between batches to spread out the load")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1")
+
+        total = 0
+        for deleted in SessionStore.expired_batches(
+            batch_size=options['batch_size'],
+            max_batches=options['max_batches'],
+        ):
+            total += deleted
+            self.stdout.write(f"Deleted {deleted} expired sessions ({total} so far)")
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(f"Deleted {total} expired sessions"))
@@ -0,0 +1,48 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from nails.seeding import clear_salon, seed_salon
+
+
+class Command(BaseCommand):
+    help = "Generate a reproducible synthetic salon dataset for load testing"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--appointments', type=int, default=20000)
+        parser.add_argument('--services', type=int, default=30)
+        parser.add_argument('--portfolio', type=int, default=200)
+        parser.add_argument('--clients', type=int, default=800)
+        parser.add_argument('--years', type=int, default=3, help="Years of appointment history")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--today', help="Anchor date (YYYY-MM-DD) for fully reproducible output")
+        parser.add_argument('--clear', action='store_true', help="Delete existing salon data first")
+
+    def handle(self, *args, **options):
+        today = None
+        if options['today']:
+            try:
+                today = datetime.strptime(options['today'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError("--today must be in YYYY-MM-DD format")
+
+        with transaction.atomic():
+            if options['clear']:
+                clear_salon()
+            counts = seed_salon(
+                appointments=options['appointments'],
+                services=options['services'],
+                portfolio=options['portfolio'],
+                clients=options['clients'],
+                years=options['years'],
+                seed=options['seed'],
+                batch_size=options['batch_size'],
+                today=today,
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            "Seeded {services} services, {portfolio} portfolio items, "
+            "{appointments} appointments for {clients} clients".format(**counts)
+        ))
@@ -0,0 +1,118 @@
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe
+
+from .storage import is_hashed_name
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+def parse_range(header, size):
+    """Return (start, end) for a single satisfiable byte range, None to ignore, or False if unsatisfiable"""
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None  # Malformed or multi-range: serve the whole file
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if size == 0:
+        return False  # An empty file has no bytes to send
+    if not start:
+        length = int(end)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def read_range(path, start, end):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def cache_control(path):
+    if is_hashed_name(path):
+        return f'public, max-age={settings.NAILS_MEDIA_IMMUTABLE_MAX_AGE}, immutable'
+    return f'public, max-age={settings.NAILS_MEDIA_MAX_AGE}'
+
+
+def serve_media(request, path):
+    """Serve an uploaded file with caching, conditional and range support.
+
+    Unlike ``django.views.static.serve`` this works with DEBUG off. Hashed
+    file names get an immutable year-long lifetime, ``If-None-Match`` and
+    ``If-Modified-Since`` give 304s, single byte ranges give 206s, and a
+    precompressed ``.gz`` twin is used when the client accepts gzip.
+    """
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except Exception:
+        raise Http404("Media file not found")
+    if not os.path.isfile(full_path):
+        raise Http404("Media file not found")
+
+    stat = os.stat(full_path)
+    etag = f'"{int(stat.st_mtime)}-{stat.st_size:x}"'
+    content_type, _ = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match:
+        not_modified = etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*'
+    else:
+        modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+        not_modified = modified_since is not None and int(stat.st_mtime) <= modified_since
+    if not_modified:
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        response['Cache-Control'] = cache_control(path)
+        return response
+
+    byte_range = None
+    range_header = request.headers.get('Range')
+    if range_header and request.headers.get('If-Range', etag) == etag:
+        byte_range = parse_range(range_header, stat.st_size)
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{stat.st_size}'
+            return response
+
+    gz_path = full_path + '.gz'
+    if byte_range:
+        start, end = byte_range
+        response = StreamingHttpResponse(read_range(full_path, start, end), status=206, content_type=content_type)
+        response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+        response['Content-Length'] = str(end - start + 1)
+    elif 'gzip' in request.headers.get('Accept-Encoding', '') and os.path.isfile(gz_path):
+        response = FileResponse(open(gz_path, 'rb'), content_type=content_type)
+        response['Content-Encoding'] = 'gzip'
+        response['Content-Length'] = str(os.path.getsize(gz_path))
+    else:
+        response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+        response['Content-Length'] = str(stat.st_size)
+
+    if os.path.isfile(gz_path):
+        patch_vary_headers(response, ('Accept-Encoding',))
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Accept-Ranges'] = 'bytes'
+    response['Cache-Control'] = cache_control(path)
+    return response
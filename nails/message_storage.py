@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.contrib.messages.storage.fallback import FallbackStorage
+
+
+class MessageStorage(FallbackStorage):
+    """Flash messages in a signed cookie, overflowing into an existing session.
+
+    Requests without a session cookie (the public booking flow) only ever
+    use the cookie, so a flash message never creates a session for them.
+    Requests with one keep the default cookie-first behaviour and overflow
+    into the session when the cookie would be too large. The choice looks
+    at the cookie, not ``request.user``: loading the user would read the
+    session on every request and add ``Vary: Cookie`` to every response.
+    Enable with ``MESSAGE_STORAGE = 'nails.message_storage.MessageStorage'``.
+    """
+
+    def __init__(self, request, *args, **kwargs):
+        if settings.SESSION_COOKIE_NAME not in request.COOKIES:
+            self.storage_classes = (CookieStorage,)
+        super().__init__(request, *args, **kwargs)
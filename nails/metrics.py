@@ -0,0 +1,233 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+
+# Anything else is reported as OTHER, so made-up methods can't add label sets
+HTTP_METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+
+# Histogram bucket upper bounds, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+class Histogram:
+    """Cumulative histogram in the Prometheus exposition style"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.total += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+class MetricsRegistry:
+    """Process-local store of counters and histograms keyed by label tuples.
+
+    Each gunicorn worker keeps its own registry and periodically writes a
+    snapshot of it to ``NAILS_METRICS_DIR``; ``render_all()`` adds up every
+    worker's snapshot, so a scrape sees the same totals whichever worker
+    answers it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = defaultdict(float)
+        self._help = {}
+
+    def observe(self, name, labels, value, buckets=LATENCY_BUCKETS, help_text=''):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+            self._help.setdefault(name, (help_text, 'histogram'))
+
+    def inc(self, name, labels, amount=1, help_text=''):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] += amount
+            self._help.setdefault(name, (help_text, 'counter'))
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self._help.clear()
+
+    def snapshot(self):
+        """Everything recorded so far, as JSON-serializable data"""
+        with self._lock:
+            return {
+                'help': {name: list(value) for name, value in self._help.items()},
+                'counters': [[name, labels, value] for (name, labels), value in self._counters.items()],
+                'histograms': [
+                    [name, labels, list(h.buckets), h.counts, h.total, h.sum]
+                    for (name, labels), h in self._histograms.items()
+                ],
+            }
+
+    def merge(self, snapshot):
+        """Add another registry's ``snapshot()`` to this one"""
+        with self._lock:
+            for name, (help_text, kind) in snapshot['help'].items():
+                self._help.setdefault(name, (help_text, kind))
+            for name, labels, value in snapshot['counters']:
+                self._counters[(name, tuple(map(tuple, labels)))] += value
+            for name, labels, buckets, counts, total, total_sum in snapshot['histograms']:
+                key = (name, tuple(map(tuple, labels)))
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    histogram = self._histograms[key] = Histogram(tuple(buckets))
+                histogram.counts = [a + b for a, b in zip(histogram.counts, counts)]
+                histogram.total += total
+                histogram.sum += total_sum
+
+    def render(self):
+        """Render all metrics in the Prometheus text exposition format"""
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+            help_map = dict(self._help)
+
+        lines = []
+        seen = set()
+
+        def header(name):
+            if name not in seen:
+                seen.add(name)
+                help_text, kind = help_map.get(name, ('', 'untyped'))
+                if help_text:
+                    lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+
+        for (name, labels), value in counters:
+            header(name)
+            lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+
+        for (name, labels), histogram in histograms:
+            header(name)
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                bucket_labels = labels + (('le', _format_value(bound)),)
+                lines.append(f'{name}_bucket{_format_labels(bucket_labels)} {count}')
+            inf_labels = labels + (('le', '+Inf'),)
+            lines.append(f'{name}_bucket{_format_labels(inf_labels)} {histogram.total}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(histogram.sum)}')
+            lines.append(f'{name}_count{_format_labels(labels)} {histogram.total}')
+
+        return '\n'.join(lines) + '\n'
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    parts = []
+    for key, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{key}="{value}"')
+    return '{' + ','.join(parts) + '}'
+
+
+def _format_value(value):
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+registry = MetricsRegistry()
+_last_write = 0.0
+
+
+def snapshot_path(pid=None):
+    return os.path.join(settings.NAILS_METRICS_DIR, f'{pid or os.getpid()}.json')
+
+
+def write_snapshot(force=False):
+    """Save this worker's registry for ``render_all``, at most every NAILS_METRICS_WRITE_SECONDS"""
+    global _last_write
+    if not settings.NAILS_METRICS_DIR:
+        return
+    now = time.monotonic()
+    if not force and now - _last_write < settings.NAILS_METRICS_WRITE_SECONDS:
+        return
+    _last_write = now
+    os.makedirs(settings.NAILS_METRICS_DIR, exist_ok=True)
+    path = snapshot_path()
+    # Write then rename, so a scrape never reads half a file
+    with open(f'{path}.tmp', 'w') as f:
+        json.dump(registry.snapshot(), f)
+    os.replace(f'{path}.tmp', path)
+
+
+def render_all():
+    """Every worker's metrics added together, in the Prometheus text format.
+
+    Other workers' numbers are as of their last snapshot; this worker's are
+    live. Snapshots of workers that have exited are kept, so counters don't
+    go backwards when gunicorn replaces a worker.
+    """
+    if not settings.NAILS_METRICS_DIR:
+        return registry.render()
+    combined = MetricsRegistry()
+    combined.merge(registry.snapshot())
+    own = os.path.basename(snapshot_path())
+    try:
+        names = os.listdir(settings.NAILS_METRICS_DIR)
+    except FileNotFoundError:
+        names = []
+    for name in names:
+        if not name.endswith('.json') or name == own:
+            continue
+        try:
+            with open(os.path.join(settings.NAILS_METRICS_DIR, name)) as f:
+                combined.merge(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return combined.render()
+
+
+def method_label(method):
+    return method if method in HTTP_METHODS else 'OTHER'
+
+
+def observe_request(view, method, status, duration, query_count, query_time):
+    labels = {'view': view, 'method': method_label(method)}
+    registry.observe(
+        'nails_request_duration_seconds', labels, duration,
+        help_text='Request latency by URL name',
+    )
+    registry.observe(
+        'nails_request_db_queries', labels, query_count, buckets=QUERY_COUNT_BUCKETS,
+        help_text='Database queries per request by URL name',
+    )
+    registry.inc(
+        'nails_request_db_seconds_total', labels, query_time,
+        help_text='Total time spent in database queries by URL name',
+    )
+    registry.inc(
+        'nails_requests_total', dict(labels, status=str(status)),
+        help_text='Requests by URL name and response status',
+    )
+
+
+def observe_email(kind, duration, success):
+    registry.observe(
+        'nails_email_send_duration_seconds', {'kind': kind}, duration,
+        help_text='Time spent sending email by message kind',
+    )
+    registry.inc(
+        'nails_emails_total', {'kind': kind, 'result': 'sent' if success else 'failed'},
+        help_text='Emails sent by message kind and result',
+    )
@@ -0,0 +1,135 @@
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.urls import Resolver404, resolve
+
+from . import metrics, profiling, routers
+
+logger = logging.getLogger('nails.requests')
+
+
+class QueryRecorder:
+    """``execute_wrapper`` hook that counts queries and their total time"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start
+
+
+class RequestMetricsMiddleware:
+    """Record latency and DB usage for every request, labelled by URL name"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        match = getattr(request, 'resolver_match', None)
+        view = match.url_name if match and match.url_name else 'unresolved'
+        method = metrics.method_label(request.method)
+        metrics.observe_request(
+            view, method, response.status_code,
+            duration, recorder.count, recorder.duration,
+        )
+        metrics.write_snapshot()
+        logger.info(
+            'request view=%s method=%s status=%s duration_ms=%.1f queries=%d db_ms=%.1f',
+            view, method, response.status_code,
+            duration * 1000, recorder.count, recorder.duration * 1000,
+            extra={
+                'view': view,
+                'method': method,
+                'status': response.status_code,
+                'duration_ms': round(duration * 1000, 1),
+                'queries': recorder.count,
+                'db_ms': round(recorder.duration * 1000, 1),
+            },
+        )
+        return response
+
+
+class ProfilingMiddleware:
+    """Run opted-in dashboard views under cProfile for staff users.
+
+    Add ``?_profile=1`` or an ``X-Profile: 1`` header to a request for one of
+    the views in ``NAILS_PROFILE_VIEWS``; the report is saved to the on-disk
+    ring buffer and can be browsed at ``/dashboard/profiles/``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not self.should_profile(request):
+            return self.get_response(request)
+        # Profile the rest of the handler rather than calling the view from
+        # process_view, so process_exception and template rendering still
+        # run (and are measured) as usual
+        return profiling.profile_request(request, self.get_response)
+
+    def should_profile(self, request):
+        if not profiling.wants_profile(request):
+            return False
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return False
+        return match.url_name in settings.NAILS_PROFILE_VIEWS
+
+
+class ReplicaRoutingMiddleware:
+    """Serve safe requests to ``NAILS_REPLICA_VIEWS`` from the read replica.
+
+    Any unsafe request (a booking, a status change, a login) sets a short-lived
+    cookie that keeps that browser on the primary, so the redirect that
+    follows reads its own write despite replication lag.
+    """
+
+    PIN_COOKIE = 'nails_primary'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            response = self.get_response(request)
+            if routers.replica_configured():
+                response.set_cookie(
+                    self.PIN_COOKIE, '1',
+                    max_age=settings.NAILS_REPLICA_PIN_SECONDS,
+                    httponly=True, samesite='Lax',
+                    secure=settings.SESSION_COOKIE_SECURE,
+                )
+            return response
+
+        if not self.should_use_replica(request):
+            return self.get_response(request)
+        with routers.use_replica():
+            return self.get_response(request)
+
+    def should_use_replica(self, request):
+        if not routers.replica_configured() or request.COOKIES.get(self.PIN_COOKIE):
+            return False
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return False
+        return match.url_name in settings.NAILS_REPLICA_VIEWS
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nails', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedAppointment',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('client_name', models.CharField(max_length=100)),
+                ('client_email', models.EmailField(max_length=254)),
+                ('client_phone', models.CharField(max_length=20)),
+                ('service_name', models.CharField(help_text='Service name when archived', max_length=200)),
+                ('service_price', models.DecimalField(decimal_places=2, help_text='Service price when archived', max_digits=6)),
+                ('appointment_date', models.DateField()),
+                ('appointment_time', models.TimeField()),
+                ('duration', models.PositiveIntegerField(help_text='Duration in minutes')),
+                ('special_requests', models.TextField(blank=True)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('CONFIRMED', 'Confirmed'), ('COMPLETED', 'Completed'), ('CANCELLED', 'Cancelled')], max_length=20)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-appointment_date', '-appointment_time'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['appointment_date', 'status'], name='nails_appoi_appoint_8076fb_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedappointment',
+            name='service',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='nails.service'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedappointment',
+            index=models.Index(fields=['appointment_date'], name='nails_archi_appoint_d01759_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedappointment',
+            index=models.Index(fields=['client_email'], name='nails_archi_client__4cd169_idx'),
+        ),
+    ]
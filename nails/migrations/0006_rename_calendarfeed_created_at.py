@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 14:20
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nails', '0005_counter'),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='calendarfeed',
+            old_name='created_at',
+            new_name='token_updated_at',
+        ),
+    ]
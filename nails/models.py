@@ -43,8 +43,18 @@ class Appointment(models.Model):
         ('CONFIRMED', 'Confirmed'),
         ('COMPLETED', 'Completed'),
         ('CANCELLED', 'Cancelled'),
+        ('NO_SHOW', 'No-show'),
     ]
     
+    # Statuses each status may move to through the bulk actions
+    STATUS_TRANSITIONS = {
+        'PENDING': ['CONFIRMED', 'COMPLETED', 'CANCELLED', 'NO_SHOW'],
+        'CONFIRMED': ['COMPLETED', 'CANCELLED', 'NO_SHOW'],
+        'COMPLETED': [],
+        'CANCELLED': [],
+        'NO_SHOW': [],
+    }
+    
     client_name = models.CharField(max_length=100)
     client_email = models.EmailField()
     client_phone = models.CharField(max_length=20)
@@ -58,11 +68,75 @@ class Appointment(models.Model):
     
     class Meta:
         ordering = ['-appointment_date', '-appointment_time']
+        indexes = [
+            models.Index(fields=['appointment_date', 'status']),
+        ]
         app_label = 'nails'
     
     def __str__(self):
         return f"{self.client_name} - {self.service.name} - {self.appointment_date}"
 
+class ArchivedAppointment(models.Model):
+    """Finished appointment moved out of the live table by archive_appointments"""
+    STATUS_CHOICES = Appointment.STATUS_CHOICES
+    
+    # Keeps the original Appointment id so links and exports stay stable
+    id = models.BigIntegerField(primary_key=True)
+    client_name = models.CharField(max_length=100)
+    client_email = models.EmailField()
+    client_phone = models.CharField(max_length=20)
+    service = models.ForeignKey(Service, on_delete=models.SET_NULL, null=True, blank=True)
+    service_name = models.CharField(max_length=200, help_text="Service name when archived")
+    service_price = models.DecimalField(max_digits=6, decimal_places=2, help_text="Service price when archived")
+    appointment_date = models.DateField()
+    appointment_time = models.TimeField()
+    duration = models.PositiveIntegerField(help_text="Duration in minutes")
+    special_requests = models.TextField(blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    is_archived = True
+    
+    class Meta:
+        ordering = ['-appointment_date', '-appointment_time']
+        indexes = [
+            models.Index(fields=['appointment_date']),
+            models.Index(fields=['client_email']),
+        ]
+        app_label = 'nails'
+    
+    def __str__(self):
+        return f"{self.client_name} - {self.service_name} - {self.appointment_date} (archived)"
+
+class CalendarFeed(models.Model):
+    """Secret token in a staff member's iCalendar feed URL; resetting it revokes old links"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='calendar_feed')
+    token = models.CharField(max_length=64, unique=True)
+    # Set whenever the token is (re)issued
+    token_updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        app_label = 'nails'
+    
+    def __str__(self):
+        return f"Calendar feed for {self.user}"
+
+class Counter(models.Model):
+    """A version number that cache keys and ETags are built from.
+
+    Kept in the database, not the cache, so it can't be evicted and start
+    over at a value that was already handed out.
+    """
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.BigIntegerField()
+    
+    class Meta:
+        app_label = 'nails'
+    
+    def __str__(self):
+        return f"{self.name} = {self.value}"
+
 class WorkingHours(models.Model):
     DAY_CHOICES = [
         (0, 'Monday'),
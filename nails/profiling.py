@@ -0,0 +1,136 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import time
+from contextlib import ExitStack
+from datetime import datetime
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+PROFILE_NAME_RE = re.compile(r'^[0-9]{8}T[0-9]{12}-[a-z0-9_]+\.json$')
+
+
+def get_profile_dir():
+    return str(settings.NAILS_PROFILE_DIR)
+
+
+def wants_profile(request):
+    """True if a staff user asked for this request to be profiled"""
+    if not settings.NAILS_PROFILING_ENABLED:
+        return False
+    # Check the opt-in first: reading request.user loads the session
+    if request.GET.get('_profile') != '1' and request.headers.get('X-Profile') != '1':
+        return False
+    user = getattr(request, 'user', None)
+    return user is not None and user.is_staff
+
+
+class SQLRecorder:
+    """``execute_wrapper`` hook that keeps every statement and its duration"""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'sql': sql,
+                'params': repr(params)[:500],
+                'ms': round((time.perf_counter() - start) * 1000, 3),
+            })
+
+
+def profile_request(request, get_response):
+    """Run the rest of the request under cProfile with SQL capture and store the report.
+
+    The report is saved even if ``get_response`` raises; the exception is
+    then re-raised unchanged.
+    """
+    profiler = cProfile.Profile()
+    recorder = SQLRecorder()
+    response = None
+    error = None
+    start = time.perf_counter()
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = profiler.runcall(get_response, request)
+    except Exception as e:
+        error = f'{type(e).__name__}: {e}'
+        raise
+    finally:
+        save_report(build_report(request, response, error, profiler, recorder, time.perf_counter() - start))
+    return response
+
+
+def build_report(request, response, error, profiler, recorder, duration):
+    """The stored report: request details, SQL statements and the cProfile listing"""
+    stats_output = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stats_output)
+    stats.sort_stats('cumulative').print_stats(60)
+
+    match = request.resolver_match
+    return {
+        'view': match.url_name if match and match.url_name else 'unresolved',
+        'path': request.get_full_path(),
+        'method': request.method,
+        'user': request.user.get_username(),
+        'status': response.status_code if response is not None else 500,
+        'error': error,
+        'created_at': timezone.now().isoformat(),
+        'duration_ms': round(duration * 1000, 1),
+        'query_count': len(recorder.queries),
+        'query_ms': round(sum(q['ms'] for q in recorder.queries), 3),
+        'queries': recorder.queries,
+        'profile': stats_output.getvalue(),
+    }
+
+
+def save_report(report):
+    """Write a report into the ring buffer, dropping the oldest beyond the limit"""
+    directory = get_profile_dir()
+    os.makedirs(directory, exist_ok=True)
+    stamp = datetime.now().strftime('%Y%m%dT%H%M%S%f')
+    view = re.sub(r'[^a-z0-9_]', '_', report['view'].lower())
+    name = f'{stamp}-{view}.json'
+    path = os.path.join(directory, name)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(report, f)
+    os.replace(tmp_path, path)
+
+    for old in list_reports()[settings.NAILS_PROFILE_KEEP:]:
+        try:
+            os.remove(os.path.join(directory, old))
+        except FileNotFoundError:
+            pass
+    return name
+
+
+def list_reports():
+    """Report file names, newest first"""
+    directory = get_profile_dir()
+    if not os.path.isdir(directory):
+        return []
+    names = [name for name in os.listdir(directory) if PROFILE_NAME_RE.match(name)]
+    return sorted(names, reverse=True)
+
+
+def load_report(name):
+    """Load a stored report, or None if the name is invalid or gone"""
+    if not PROFILE_NAME_RE.match(name):
+        return None
+    try:
+        with open(os.path.join(get_profile_dir(), name)) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
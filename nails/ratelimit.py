@@ -0,0 +1,113 @@
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, JsonResponse
+
+# Per-bucket lock: expires on its own if a worker dies holding it, and
+# contended requests give up after LOCK_WAIT seconds
+LOCK_TIMEOUT = 2
+LOCK_WAIT = 0.1
+
+
+def parse_rate(rate):
+    """Turn '30/m' into (30, 60.0); accepts s, m, h and d periods"""
+    count, _, period = rate.partition('/')
+    seconds = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}[period[:1]]
+    return int(count), float(seconds)
+
+
+def get_client_ip(request):
+    """The connecting client's IP address.
+
+    ``X-Forwarded-For`` is only read when ``NAILS_RATELIMIT_TRUST_FORWARDED``
+    is on. Clients can put anything in it, so the address used is the one
+    that the last of ``NAILS_RATELIMIT_PROXY_COUNT`` trusted proxies appended.
+    That is counted from the right, not the left-most entry.
+    """
+    if settings.NAILS_RATELIMIT_TRUST_FORWARDED:
+        forwarded = [ip.strip() for ip in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if ip.strip()]
+        hops = settings.NAILS_RATELIMIT_PROXY_COUNT
+        if hops >= 1 and len(forwarded) >= hops:
+            return forwarded[-hops]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def get_client_key(request, key):
+    if key == 'session':
+        session = getattr(request, 'session', None)
+        if session is not None and session.session_key:
+            return f"session:{session.session_key}"
+    return f"ip:{get_client_ip(request)}"
+
+
+def take_token(bucket_key, rate, burst=None):
+    """Take one token from a cache-stored bucket.
+
+    Implemented as GCRA, which stores a single "theoretical arrival time"
+    per client instead of a token count plus timestamp. Returns
+    ``(allowed, retry_after_seconds)``.
+
+    The read-modify-write runs under a per-bucket lock taken with
+    ``cache.add``, which is atomic on every backend. That way concurrent
+    requests in different workers can't spend the same token. A request
+    that can't get the lock quickly is turned away, because it is
+    competing with the same client's other requests.
+    """
+    count, period = parse_rate(rate)
+    interval = period / count
+    burst = burst or count
+    tolerance = interval * (burst - 1)
+
+    lock_key = f"{bucket_key}:lock"
+    deadline = time.monotonic() + LOCK_WAIT
+    while not cache.add(lock_key, 1, timeout=LOCK_TIMEOUT):
+        if time.monotonic() >= deadline:
+            return False, interval
+        time.sleep(0.005)
+    try:
+        now = time.time()
+        tat = max(cache.get(bucket_key) or now, now)
+        allowed_at = tat - tolerance
+        if now < allowed_at:
+            return False, allowed_at - now
+
+        new_tat = tat + interval
+        cache.set(bucket_key, new_tat, timeout=math.ceil(new_tat - now) + 1)
+        return True, 0
+    finally:
+        cache.delete(lock_key)
+
+
+def too_many_requests(retry_after, json=False):
+    retry_after = max(1, math.ceil(retry_after))
+    if json:
+        response = JsonResponse({'error': 'Too many requests, please slow down.'}, status=429)
+    else:
+        response = HttpResponse(
+            "Too many requests, please wait a moment and try again.",
+            status=429, content_type='text/plain; charset=utf-8',
+        )
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
+def rate_limit(group, rate, key='ip', burst=None, methods=None, json=False):
+    """Reject requests over ``rate`` per client with a 429 and ``Retry-After``.
+
+    The bucket lives in Django's cache, so limits are shared across gunicorn
+    workers whenever a shared cache backend (e.g. Redis) is configured.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped(request, *args, **kwargs):
+            if settings.NAILS_RATELIMIT_ENABLED and (methods is None or request.method in methods):
+                bucket_key = f"ratelimit:{group}:{get_client_key(request, key)}"
+                allowed, retry_after = take_token(bucket_key, rate, burst)
+                if not allowed:
+                    return too_many_requests(retry_after, json=json)
+            return view_func(request, *args, **kwargs)
+        return _wrapped
+    return decorator
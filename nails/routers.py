@@ -0,0 +1,67 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+REPLICA_ALIAS = 'replica'
+
+# Set per request by ReplicaRoutingMiddleware; contextvars keep this correct
+# under both threaded WSGI workers and ASGI.
+_use_replica = ContextVar('nails_use_replica', default=False)
+_pinned = ContextVar('nails_pinned_to_primary', default=False)
+
+
+def replica_configured():
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+@contextmanager
+def use_replica():
+    """Send reads inside the block to the replica, unless pinned to primary"""
+    use_token = _use_replica.set(True)
+    pin_token = _pinned.set(False)
+    try:
+        yield
+    finally:
+        _pinned.reset(pin_token)
+        _use_replica.reset(use_token)
+
+
+@contextmanager
+def use_primary():
+    """Force every read inside the block onto the primary"""
+    token = _use_replica.set(False)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+def pinned_to_primary():
+    return _pinned.get()
+
+
+class PrimaryReplicaRouter:
+    """Route opted-in reads to the replica and everything else to the primary.
+
+    Reads only go to the replica inside ``use_replica()``. The first write in
+    that block pins the rest of it to the primary so a request always sees
+    its own writes.
+    """
+
+    def db_for_read(self, model, **hints):
+        if _use_replica.get() and not _pinned.get() and replica_configured():
+            return REPLICA_ALIAS
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        if _use_replica.get():
+            _pinned.set(True)
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
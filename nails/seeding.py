@@ -0,0 +1,148 @@
+import random
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.utils import timezone
+
+from .models import Service, PortfolioItem, Appointment, WorkingHours
+
+SERVICE_STYLES = ['Classic', 'Gel', 'Acrylic', 'Dip Powder', 'Builder Gel', 'Deluxe', 'Express', 'Signature']
+SERVICE_TYPES = ['Manicure', 'Pedicure', 'Full Set', 'Fill', 'Nail Art', 'Removal', 'Spa Treatment']
+FIRST_NAMES = ['Ava', 'Mia', 'Zoe', 'Lily', 'Emma', 'Nora', 'Chloe', 'Grace', 'Ruby', 'Isla',
+               'Sofia', 'Maya', 'Leah', 'Aria', 'Ella', 'Hana', 'Jade', 'Nia', 'Rosa', 'Tara']
+LAST_NAMES = ['Smith', 'Nguyen', 'Garcia', 'Kim', 'Brown', 'Patel', 'Lopez', 'Okafor', 'Chen', 'Rossi',
+              'Muller', 'Silva', 'Khan', 'Ito', 'Novak', 'Dubois', 'Walsh', 'Haddad', 'Jensen', 'Moreau']
+PORTFOLIO_TAGS = ['floral', 'summer', 'french tip', 'ombre', 'glitter', 'chrome', 'minimal', 'marble',
+                  'holiday', 'matte', 'neon', 'pastel']
+SLOT_TIMES = [time(hour, minute) for hour in range(9, 18) for minute in (0, 30)]
+
+
+def create_appointments(appointments, created_at):
+    """bulk_create ``appointments``, then give them the ``created_at`` values given.
+
+    ``auto_now_add`` overwrites ``created_at`` on insert, so the real values
+    are written with a follow-up bulk_update of the new rows.
+    """
+    created = Appointment.objects.bulk_create(appointments)
+    for appointment, value in zip(created, created_at):
+        appointment.created_at = value
+    Appointment.objects.bulk_update(created, ['created_at'])
+
+
+def seed_services(rng, count):
+    services = []
+    for i in range(count):
+        style = SERVICE_STYLES[i % len(SERVICE_STYLES)]
+        kind = SERVICE_TYPES[(i // len(SERVICE_STYLES)) % len(SERVICE_TYPES)]
+        name = f"{style} {kind}"
+        if i >= len(SERVICE_STYLES) * len(SERVICE_TYPES):
+            name = f"{name} {i}"
+        services.append(Service(
+            name=name,
+            description=f"{style} {kind.lower()} with cuticle care and finish of your choice.",
+            price=Decimal(rng.randrange(2000, 12000)) / 100,
+            duration=rng.choice([30, 45, 60, 75, 90, 120]),
+            is_active=rng.random() > 0.1,
+        ))
+    return Service.objects.bulk_create(services)
+
+
+def seed_working_hours():
+    hours = [
+        WorkingHours(day_of_week=day, start_time=time(9, 0), end_time=time(18, 0), is_working=day != 6)
+        for day in range(7)
+    ]
+    return WorkingHours.objects.bulk_create(hours)
+
+
+def seed_portfolio(rng, count, batch_size):
+    shapes = [value for value, _ in PortfolioItem.NAIL_SHAPE_CHOICES]
+    items = [
+        PortfolioItem(
+            title=f"Design #{i + 1}",
+            image=f"portfolio/seed-{i + 1}.jpg",
+            description="Seeded portfolio design.",
+            nail_shape=rng.choice(shapes),
+            tags=', '.join(rng.sample(PORTFOLIO_TAGS, 3)),
+            featured=rng.random() < 0.1,
+        )
+        for i in range(count)
+    ]
+    return PortfolioItem.objects.bulk_create(items, batch_size=batch_size)
+
+
+def make_clients(rng, count):
+    clients = []
+    for i in range(count):
+        first = rng.choice(FIRST_NAMES)
+        last = rng.choice(LAST_NAMES)
+        clients.append((
+            f"{first} {last}",
+            f"{first.lower()}.{last.lower()}{i}@example.com",
+            f"555-{rng.randrange(100, 1000)}-{rng.randrange(1000, 10000)}",
+        ))
+    return clients
+
+
+def seed_appointments(rng, count, services, clients, years, batch_size, today=None):
+    """Spread ``count`` appointments over the last ``years`` plus 60 days ahead"""
+    today = today or timezone.now().date()
+    start = today - timedelta(days=365 * years)
+    span = (today + timedelta(days=60) - start).days
+    tz = timezone.get_current_timezone()
+
+    appointments = []
+    created_at = []
+    for _ in range(count):
+        day = start + timedelta(days=rng.randrange(span))
+        if day.weekday() == 6:
+            day += timedelta(days=1)
+        if day < today:
+            status = rng.choices(['COMPLETED', 'CANCELLED', 'CONFIRMED'], weights=[85, 12, 3])[0]
+        else:
+            status = rng.choices(['PENDING', 'CONFIRMED', 'CANCELLED'], weights=[45, 50, 5])[0]
+        service = rng.choice(services)
+        name, email, phone = rng.choice(clients)
+        booked_days_ahead = rng.randrange(0, 30)
+        booked_at = datetime.combine(day - timedelta(days=booked_days_ahead), time(rng.randrange(7, 22)))
+        appointments.append(Appointment(
+            client_name=name,
+            client_email=email,
+            client_phone=phone,
+            service=service,
+            appointment_date=day,
+            appointment_time=rng.choice(SLOT_TIMES),
+            duration=service.duration,
+            special_requests=rng.choice(['', '', '', 'Short nails please', 'Bringing a reference photo']),
+            status=status,
+        ))
+        created_at.append(timezone.make_aware(booked_at, tz))
+        if len(appointments) >= batch_size:
+            create_appointments(appointments, created_at)
+            appointments, created_at = [], []
+    if appointments:
+        create_appointments(appointments, created_at)
+
+
+def clear_salon():
+    Appointment.objects.all().delete()
+    PortfolioItem.objects.all().delete()
+    WorkingHours.objects.all().delete()
+    Service.objects.all().delete()
+
+
+def seed_salon(appointments=20000, services=30, portfolio=200, clients=800, years=3,
+               seed=42, batch_size=1000, today=None):
+    """Generate a reproducible salon dataset; the same seed gives the same rows"""
+    rng = random.Random(seed)
+    service_objs = seed_services(rng, services)
+    seed_working_hours()
+    seed_portfolio(rng, portfolio, batch_size)
+    client_rows = make_clients(rng, clients)
+    seed_appointments(rng, appointments, service_objs, client_rows, years, batch_size, today)
+    return {
+        'services': len(service_objs),
+        'portfolio': portfolio,
+        'clients': len(client_rows),
+        'appointments': appointments,
+    }
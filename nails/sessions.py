@@ -0,0 +1,79 @@
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.contrib.sessions.backends.base import CreateError, UpdateError
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+from django.utils import timezone
+
+
+class SessionStore(CachedDBStore):
+    """Cache-backed sessions that only write through to the DB once logged in.
+
+    Reads always come from the cache first, so a logged-in request normally
+    costs no session query at all. Sessions of logged-in staff are also saved
+    to ``django_session`` so they survive a cache flush or restart; anonymous
+    visitors' sessions live in the cache only and are never saved to the DB.
+    The cache must be shared by every worker: a logout on one worker only
+    clears that worker's cached copy of a per-process cache. Settings only
+    enable it (``SESSION_ENGINE = 'nails.sessions'``) when Redis is set up.
+    """
+
+    def is_persistent(self):
+        return SESSION_KEY in self._session
+
+    def save(self, must_create=False):
+        if self.is_persistent():
+            try:
+                return super().save(must_create)
+            except UpdateError:
+                # First save after logging in: until now the session only
+                # lived in the cache, so there is no row to update yet
+                return super().save(must_create=True)
+        if self.session_key is None:
+            return self.create()
+        func = self._cache.add if must_create else self._cache.set
+        result = func(self.cache_key, self._get_session(no_load=must_create), self.get_expiry_age())
+        if must_create and not result:
+            raise CreateError
+
+    async def asave(self, must_create=False):
+        if self.is_persistent():
+            try:
+                return await super().asave(must_create)
+            except UpdateError:
+                return await super().asave(must_create=True)
+        if self.session_key is None:
+            return await self.acreate()
+        func = self._cache.aadd if must_create else self._cache.aset
+        result = await func(
+            await self.acache_key(),
+            self._get_session(no_load=must_create),
+            await self.aget_expiry_age(),
+        )
+        if must_create and not result:
+            raise CreateError
+
+    @classmethod
+    def expired_batches(cls, batch_size=None, max_batches=None):
+        """Delete expired DB sessions a batch at a time, yielding each batch's size.
+
+        Short deletes keep locks on ``django_session`` brief, so logins are not
+        held up while a large backlog is cleared. Cache entries expire by TTL.
+        """
+        batch_size = batch_size or settings.NAILS_SESSION_CLEANUP_BATCH_SIZE
+        model = cls.get_model_class()
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            keys = list(
+                model.objects.filter(expire_date__lt=timezone.now())
+                .values_list('session_key', flat=True)[:batch_size]
+            )
+            if not keys:
+                break
+            deleted, _ = model.objects.filter(session_key__in=keys).delete()
+            batches += 1
+            yield deleted
+
+    @classmethod
+    def clear_expired(cls):
+        for _ in cls.expired_batches():
+            pass
@@ -0,0 +1,104 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import Signal, receiver
+
+from . import events, ics
+from .counters import bump_counter, get_counter
+from .models import Service, Appointment, WorkingHours
+
+AVAILABILITY_VERSION = 'availability'
+
+# Sent once per bulk status change (queryset.update() skips post_save)
+# with ``ids`` and the new ``status``.
+appointments_status_changed = Signal()
+
+# Sent once per archived batch with the ``ids`` moved out of the live table
+appointments_archived = Signal()
+
+
+def availability_version():
+    return get_counter(AVAILABILITY_VERSION)
+
+
+def bump_availability_version():
+    """Invalidate every cached availability result (and API/calendar ETag) at once.
+
+    The counter row is updated in the same transaction as the change, so no
+    other request can see the new version alongside the old data.
+    """
+    bump_counter(AVAILABILITY_VERSION)
+
+
+@receiver(post_save, sender=Appointment)
+@receiver(post_delete, sender=Appointment)
+@receiver(post_save, sender=WorkingHours)
+@receiver(post_delete, sender=WorkingHours)
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+def invalidate_availability(sender, **kwargs):
+    bump_availability_version()
+
+
+# The live event log needs a shared cache (see events.publish); without one
+# don't spend queries building payloads nobody can receive
+@receiver(post_save, sender=Appointment)
+def publish_appointment_saved(sender, instance, created, **kwargs):
+    def publish():
+        events.publish(
+            'appointment_created' if created else 'appointment_updated',
+            {'appointment': events.appointment_payload(instance), 'stats': events.appointment_stats()},
+        )
+    if settings.NAILS_SHARED_CACHE:
+        transaction.on_commit(publish)
+
+
+@receiver(post_delete, sender=Appointment)
+def publish_appointment_deleted(sender, instance, **kwargs):
+    if settings.NAILS_SHARED_CACHE:
+        transaction.on_commit(lambda: events.publish('appointment_removed', {'id': instance.id}))
+
+
+@receiver(post_save, sender=Appointment)
+@receiver(post_delete, sender=Appointment)
+def invalidate_calendar_event(sender, instance, **kwargs):
+    ics.invalidate_events([instance.id])
+
+
+@receiver(post_save, sender=Service)
+def invalidate_service_calendar_events(sender, instance, created, **kwargs):
+    if created or not settings.NAILS_SHARED_CACHE:
+        return
+    ics.invalidate_events(Appointment.objects.filter(service=instance).values_list('id', flat=True))
+
+
+@receiver(appointments_status_changed)
+def handle_bulk_status_change(sender, ids, status, **kwargs):
+    bump_availability_version()
+    ics.invalidate_events(ids)
+
+    def publish():
+        events.publish('appointments_bulk_updated', {
+            'ids': list(ids),
+            'status': status,
+            'status_display': dict(Appointment.STATUS_CHOICES)[status],
+            'stats': events.appointment_stats(),
+        })
+    if settings.NAILS_SHARED_CACHE:
+        transaction.on_commit(publish)
+
+
+@receiver(appointments_archived)
+def handle_appointments_archived(sender, ids, **kwargs):
+    bump_availability_version()
+    ics.invalidate_events(ids)
+
+    # Archived appointments are long past, so they're never on the dashboard's
+    # cards; one event with fresh counters is enough.
+    def publish():
+        events.publish('appointments_archived', {
+            'count': len(ids),
+            'stats': events.appointment_stats(),
+        })
+    if settings.NAILS_SHARED_CACHE:
+        transaction.on_commit(publish)
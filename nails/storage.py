@@ -0,0 +1,67 @@
+import gzip
+import hashlib
+import os
+import re
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{12}\.[A-Za-z0-9]+$')
+
+# Image formats are already compressed; only these benefit from a .gz twin
+COMPRESSIBLE_EXTENSIONS = {'.svg', '.txt', '.json', '.css', '.js', '.html', '.xml', '.bmp', '.tif', '.tiff'}
+
+
+def is_hashed_name(name):
+    return bool(HASHED_NAME_RE.search(name))
+
+
+class HashedMediaStorage(FileSystemStorage):
+    """Store uploads under a content-hashed name, e.g. ``portfolio/rose.3f2a9c1b7d4e.jpg``.
+
+    A file's URL changes whenever its content does, so it can be served
+    with a year-long ``immutable`` cache lifetime. Re-uploading identical
+    content reuses the existing file, and compressible formats also get a
+    precompressed ``.gz`` twin for the media view to serve.
+    """
+
+    def hashed_name(self, name, content):
+        digest = hashlib.sha256()
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        root, ext = os.path.splitext(name)
+        return f"{root}.{digest.hexdigest()[:12]}{ext.lower()}"
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        hashed = self.hashed_name(self.generate_filename(name), content)
+        if self.exists(hashed):
+            return hashed
+        saved = super().save(hashed, content, max_length=max_length)
+        self.write_compressed(saved)
+        return saved
+
+    def write_compressed(self, name):
+        if os.path.splitext(name)[1].lower() not in COMPRESSIBLE_EXTENSIONS:
+            return
+        path = self.path(name)
+        with open(path, 'rb') as source:
+            data = source.read()
+        compressed = gzip.compress(data, compresslevel=9, mtime=0)
+        # Only keep the variant when it actually saves bytes
+        if len(compressed) < len(data) * 0.9:
+            with open(path + '.gz', 'wb') as target:
+                target.write(compressed)
+
+    def delete(self, name):
+        super().delete(name)
+        gz_path = self.path(name) + '.gz'
+        if os.path.exists(gz_path):
+            os.remove(gz_path)
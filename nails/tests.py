@@ -1,3 +1,961 @@
-from django.test import TestCase
+import base64
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+from contextlib import ExitStack
+from datetime import date, time as dt_time, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.contrib.auth.models import AnonymousUser, User
+from django.contrib.messages import get_messages
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.contrib.messages.storage.session import SessionStorage
+from django.contrib.sessions.models import Session
+from django.core.handlers.base import BaseHandler
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connections
+from django.http import HttpResponse
+from django.test import AsyncClient, Client, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+
+from . import events, ics, metrics, profiling, ratelimit, routers
+from .archiving import archive_appointments, archive_batch
+from .seeding import clear_salon, seed_salon
+from .bulk import bulk_update_status
+from .message_storage import MessageStorage
+from .middleware import ReplicaRoutingMiddleware
+from .counters import bump_counter, get_counter
+from .models import Appointment, ArchivedAppointment, CalendarFeed, Counter, Service
+from .sessions import SessionStore
+from .storage import HashedMediaStorage, is_hashed_name
+from .signals import appointments_status_changed, availability_version
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        self.registry = metrics.MetricsRegistry()
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = metrics.Histogram((1, 5, 10))
+        for value in (0.5, 1, 3, 7, 20):
+            histogram.observe(value)
+        self.assertEqual(histogram.counts, [2, 3, 4])
+        self.assertEqual(histogram.total, 5)
+        self.assertEqual(histogram.sum, 31.5)
+
+    def test_render(self):
+        self.registry.inc('hits_total', {'view': 'home', 'method': 'GET'}, help_text='Hits')
+        self.registry.inc('hits_total', {'method': 'GET', 'view': 'home'}, amount=2)
+        self.registry.observe('latency', {'view': 'a"b'}, 0.3, buckets=(0.1, 0.5))
+        self.assertEqual(self.registry.render(), (
+            '# HELP hits_total Hits\n'
+            '# TYPE hits_total counter\n'
+            'hits_total{method="GET",view="home"} 3\n'
+            '# TYPE latency histogram\n'
+            'latency_bucket{view="a\\"b",le="0.1"} 0\n'
+            'latency_bucket{view="a\\"b",le="0.5"} 1\n'
+            'latency_bucket{view="a\\"b",le="+Inf"} 1\n'
+            'latency_sum{view="a\\"b"} 0.3\n'
+            'latency_count{view="a\\"b"} 1\n'
+        ))
+
+    def test_merge_adds_snapshots(self):
+        other = metrics.MetricsRegistry()
+        for registry in (self.registry, other):
+            registry.inc('hits_total', {'view': 'home'})
+            registry.observe('latency', {}, 0.2, buckets=(0.1, 0.5))
+        other.inc('hits_total', {'view': 'book'})
+        self.registry.merge(json.loads(json.dumps(other.snapshot())))
+        rendered = self.registry.render()
+        self.assertIn('hits_total{view="home"} 2\n', rendered)
+        self.assertIn('hits_total{view="book"} 1\n', rendered)
+        self.assertIn('latency_bucket{le="0.5"} 2\n', rendered)
+        self.assertIn('latency_count 2\n', rendered)
+
+    def test_unknown_methods_are_grouped(self):
+        self.assertEqual(metrics.method_label('GET'), 'GET')
+        self.assertEqual(metrics.method_label('XYZZY'), 'OTHER')
+
+    def test_scrape_adds_up_every_worker(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        other = metrics.MetricsRegistry()
+        other.inc('nails_emails_total', {'kind': 'confirmation', 'result': 'sent'}, amount=4)
+        with open(os.path.join(directory, '999999.json'), 'w') as f:
+            json.dump(other.snapshot(), f)
+        with open(os.path.join(directory, 'garbage.json'), 'w') as f:
+            f.write('{')
+        user = User.objects.create_user('owner', 'owner@example.com', 'pw', is_staff=True)
+        client = Client(HTTP_HOST='localhost')
+        client.force_login(user)
+        with override_settings(NAILS_METRICS_DIR=directory, NAILS_METRICS_WRITE_SECONDS=0):
+            metrics.registry.inc('nails_emails_total', {'kind': 'confirmation', 'result': 'sent'})
+            self.addCleanup(metrics.registry.reset)
+            response = client.get(reverse('metrics'), secure=True)
+            self.assertTrue(os.path.exists(metrics.snapshot_path()))
+        self.assertIn(b'nails_emails_total{kind="confirmation",result="sent"} 5\n', response.content)
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        override = override_settings(NAILS_PROFILE_DIR=directory, NAILS_PROFILING_ENABLED=True)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.factory = RequestFactory()
+        self.staff = User.objects.create_user('owner', 'owner@example.com', 'pw', is_staff=True)
+
+    def request(self, path='/dashboard/', user=None, **extra):
+        request = self.factory.get(path, **extra)
+        request.user = user or self.staff
+        request.resolver_match = resolve('/dashboard/')
+        return request
+
+    def test_wants_profile_needs_staff_and_opt_in(self):
+        self.assertTrue(profiling.wants_profile(self.request('/dashboard/?_profile=1')))
+        self.assertTrue(profiling.wants_profile(self.request(HTTP_X_PROFILE='1')))
+        self.assertFalse(profiling.wants_profile(self.request()))
+        customer = User.objects.create_user('customer', 'c@example.com', 'pw')
+        self.assertFalse(profiling.wants_profile(self.request('/dashboard/?_profile=1', user=customer)))
+        self.assertFalse(profiling.wants_profile(self.request('/dashboard/?_profile=1', user=AnonymousUser())))
+        with override_settings(NAILS_PROFILING_ENABLED=False):
+            self.assertFalse(profiling.wants_profile(self.request('/dashboard/?_profile=1')))
+
+    def test_ring_buffer_keeps_newest(self):
+        with override_settings(NAILS_PROFILE_KEEP=3):
+            names = [profiling.save_report({'view': 'dashboard', 'n': i}) for i in range(5)]
+        self.assertEqual(profiling.list_reports(), names[:1:-1])
+        self.assertEqual(profiling.load_report(names[-1])['n'], 4)
+        self.assertIsNone(profiling.load_report(names[0]))
+
+    def test_load_report_rejects_bad_names(self):
+        name = profiling.save_report({'view': 'dashboard'})
+        self.assertIsNotNone(profiling.load_report(name))
+        for bad in ('../../etc/passwd', '../' + name, name.replace('.json', '.txt'), 'x.json'):
+            self.assertIsNone(profiling.load_report(bad))
+
+    def test_report_saved_when_handler_raises(self):
+        def get_response(request):
+            User.objects.count()
+            raise ValueError('boom')
+        with self.assertRaises(ValueError):
+            profiling.profile_request(self.request(), get_response)
+        report = profiling.load_report(profiling.list_reports()[0])
+        self.assertEqual(report['status'], 500)
+        self.assertEqual(report['error'], 'ValueError: boom')
+        self.assertEqual(report['query_count'], 1)
+
+    @override_settings(NAILS_REPLICA_VIEWS=[])
+    def test_failing_view_still_goes_through_process_exception(self):
+        client = Client(HTTP_HOST='localhost', raise_request_exception=False)
+        client.force_login(self.staff)
+        original = BaseHandler.process_exception_by_middleware
+        with mock.patch('nails.views.render', side_effect=ValueError('boom')), \
+                mock.patch.object(BaseHandler, 'process_exception_by_middleware',
+                                  autospec=True, side_effect=original) as process_exception:
+            response = client.get(reverse('dashboard'), {'_profile': '1'}, secure=True)
+        self.assertEqual(response.status_code, 500)
+        process_exception.assert_called_once()
+        report = profiling.load_report(profiling.list_reports()[0])
+        self.assertEqual((report['view'], report['status']), ('dashboard', 500))
+
+    def test_unprofiled_requests_dont_load_the_user(self):
+        loaded = []
+        request = self.factory.get('/dashboard/')
+        request.user = SimpleLazyObject(lambda: loaded.append(True) or self.staff)
+        self.assertFalse(profiling.wants_profile(request))
+        self.assertEqual(loaded, [])
+
+    @override_settings(NAILS_REPLICA_VIEWS=[])
+    def test_profiled_dashboard(self):
+        client = Client(HTTP_HOST='localhost')
+        client.force_login(self.staff)
+        self.assertEqual(client.get(reverse('dashboard'), secure=True).status_code, 200)
+        self.assertEqual(profiling.list_reports(), [])
+        self.assertEqual(client.get(reverse('dashboard'), {'_profile': '1'}, secure=True).status_code, 200)
+        report = profiling.load_report(profiling.list_reports()[0])
+        self.assertEqual(report['view'], 'dashboard')
+        self.assertIsNone(report['error'])
+        self.assertGreater(report['query_count'], 0)
+
+
+@override_settings(NAILS_RATELIMIT_ENABLED=True)
+class RateLimitTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        # A fixed clock near the real time, so cache entries don't expire
+        self.now = time.time()
+
+    def at(self, seconds_later=0):
+        return mock.patch.object(ratelimit.time, 'time', return_value=self.now + seconds_later)
+
+    def test_parse_rate(self):
+        self.assertEqual(ratelimit.parse_rate('30/m'), (30, 60.0))
+        self.assertEqual(ratelimit.parse_rate('5/hour'), (5, 3600.0))
+
+    def test_burst_then_denied_with_retry_after(self):
+        with self.at():
+            results = [ratelimit.take_token('bucket', '3/m') for _ in range(4)]
+        self.assertEqual([allowed for allowed, _ in results], [True, True, True, False])
+        self.assertAlmostEqual(results[-1][1], 20.0)
+
+    def test_tokens_refill_over_time(self):
+        with self.at():
+            for _ in range(3):
+                ratelimit.take_token('bucket', '3/m')
+            self.assertFalse(ratelimit.take_token('bucket', '3/m')[0])
+        with self.at(20):
+            self.assertTrue(ratelimit.take_token('bucket', '3/m')[0])
+            self.assertFalse(ratelimit.take_token('bucket', '3/m')[0])
+
+    def test_burst_smaller_than_rate(self):
+        with self.at():
+            results = [ratelimit.take_token('bucket', '60/m', burst=2)[0] for _ in range(3)]
+        self.assertEqual(results, [True, True, False])
+
+    def test_contended_lock_is_denied(self):
+        cache.add('bucket:lock', 1, timeout=5)
+        with mock.patch.object(ratelimit, 'LOCK_WAIT', 0):
+            allowed, retry_after = ratelimit.take_token('bucket', '3/m')
+        self.assertFalse(allowed)
+        self.assertGreater(retry_after, 0)
+        self.assertIsNone(cache.get('bucket'))
+
+    def test_lock_released_after_each_token(self):
+        ratelimit.take_token('bucket', '3/m')
+        self.assertIsNone(cache.get('bucket:lock'))
+
+    @override_settings(NAILS_RATELIMIT_TRUST_FORWARDED=False)
+    def test_forwarded_for_ignored_by_default(self):
+        request = self.factory.get('/', HTTP_X_FORWARDED_FOR='1.2.3.4', REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(ratelimit.get_client_ip(request), '10.0.0.1')
+
+    @override_settings(NAILS_RATELIMIT_TRUST_FORWARDED=True, NAILS_RATELIMIT_PROXY_COUNT=1)
+    def test_forwarded_for_uses_entry_added_by_proxy(self):
+        request = self.factory.get('/', HTTP_X_FORWARDED_FOR='6.6.6.6, 1.2.3.4', REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(ratelimit.get_client_ip(request), '1.2.3.4')
+
+    @override_settings(NAILS_RATELIMIT_TRUST_FORWARDED=True, NAILS_RATELIMIT_PROXY_COUNT=2)
+    def test_forwarded_for_with_two_proxies(self):
+        request = self.factory.get('/', HTTP_X_FORWARDED_FOR='6.6.6.6, 1.2.3.4, 10.0.0.9', REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(ratelimit.get_client_ip(request), '1.2.3.4')
+
+    @override_settings(NAILS_RATELIMIT_TRUST_FORWARDED=True, NAILS_RATELIMIT_PROXY_COUNT=2)
+    def test_forwarded_for_shorter_than_proxy_chain(self):
+        request = self.factory.get('/', HTTP_X_FORWARDED_FOR='1.2.3.4', REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(ratelimit.get_client_ip(request), '10.0.0.1')
+
+    @override_settings(NAILS_RATELIMIT_TRUST_FORWARDED=True, NAILS_RATELIMIT_PROXY_COUNT=1)
+    def test_spoofed_forwarded_for_shares_one_bucket(self):
+        view = ratelimit.rate_limit('test', '2/m')(lambda request: HttpResponse('ok'))
+        statuses = [
+            view(self.factory.get('/', HTTP_X_FORWARDED_FOR=f'9.9.9.{i}, 1.2.3.4')).status_code
+            for i in range(3)
+        ]
+        self.assertEqual(statuses, [200, 200, 429])
+
+    def test_decorator_returns_429_with_retry_after(self):
+        view = ratelimit.rate_limit('test', '1/m', json=True)(lambda request: HttpResponse('ok'))
+        self.assertEqual(view(self.factory.get('/')).status_code, 200)
+        response = view(self.factory.get('/'))
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+
+    def test_decorator_only_limits_listed_methods(self):
+        view = ratelimit.rate_limit('test', '1/m', methods=('POST',))(lambda request: HttpResponse('ok'))
+        statuses = [view(self.factory.get('/')).status_code for _ in range(3)]
+        self.assertEqual(statuses, [200, 200, 200])
+
+    @override_settings(NAILS_RATELIMIT_ENABLED=False)
+    def test_disabled(self):
+        view = ratelimit.rate_limit('test', '1/m')(lambda request: HttpResponse('ok'))
+        statuses = [view(self.factory.get('/')).status_code for _ in range(3)]
+        self.assertEqual(statuses, [200, 200, 200])
+
+
+class CounterTests(TestCase):
+    def test_new_counter_starts_from_the_clock(self):
+        before = time.time_ns() // 1_000_000
+        self.assertGreaterEqual(get_counter('test'), before)
+
+    def test_bump(self):
+        value = get_counter('test')
+        bump_counter('test')
+        bump_counter('test')
+        self.assertEqual(get_counter('test'), value + 2)
+
+    def test_bump_creates_missing_counter(self):
+        bump_counter('test')
+        self.assertTrue(Counter.objects.filter(name='test').exists())
+
+    def test_availability_version_survives_cache_loss(self):
+        version = availability_version()
+        cache.clear()
+        self.assertEqual(availability_version(), version)
+
+    def test_booking_bumps_availability_version(self):
+        service = make_service()
+        version = availability_version()
+        make_appointment(service)
+        self.assertEqual(availability_version(), version + 1)
+
+    @override_settings(NAILS_RATELIMIT_ENABLED=True)
+    def test_cached_availability_query_count(self):
+        cache.clear()
+        service = make_service()
+        client = Client(HTTP_HOST='localhost')
+        url = reverse('get_available_times')
+        params = {'date': (timezone.now().date() + timedelta(days=1)).isoformat(), 'service_id': service.id}
+        client.get(url, params, secure=True)
+        # The service lookup and the version; rate limits and results are in memory
+        with self.assertNumQueries(2):
+            self.assertEqual(client.get(url, params, secure=True).status_code, 200)
+
+
+class ReplicaRoutingTests(TransactionTestCase):
+    # Writes must commit: the replica alias has its own connection, like a
+    # real replica, so it can't see the test case's open transaction
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        self.client = Client(HTTP_HOST='localhost')
+
+    def capture(self):
+        stack = ExitStack()
+        queries = {alias: stack.enter_context(CaptureQueriesContext(connections[alias]))
+                   for alias in ('default', 'replica')}
+        return stack, queries
+
+    def service_queries(self, captured):
+        return [query for query in captured if 'nails_service' in query['sql']]
+
+    def test_reads_go_to_replica_inside_use_replica(self):
+        stack, queries = self.capture()
+        with stack, routers.use_replica():
+            list(Service.objects.all())
+        self.assertEqual(len(self.service_queries(queries['replica'])), 1)
+        self.assertEqual(self.service_queries(queries['default']), [])
+
+    def test_reads_go_to_primary_outside_use_replica(self):
+        stack, queries = self.capture()
+        with stack:
+            list(Service.objects.all())
+        self.assertEqual(queries['replica'].captured_queries, [])
+
+    def test_write_pins_rest_of_block_to_primary(self):
+        stack, queries = self.capture()
+        with stack, routers.use_replica():
+            list(Service.objects.all())
+            Service.objects.create(name='Gel', description='', price=40, duration=60)
+            self.assertTrue(routers.pinned_to_primary())
+            self.assertEqual(Service.objects.count(), 1)
+        self.assertEqual(len(self.service_queries(queries['replica'])), 1)
+        self.assertEqual(len(self.service_queries(queries['default'])), 2)
+
+    def test_pin_does_not_outlive_block(self):
+        with routers.use_replica():
+            Service.objects.create(name='Gel', description='', price=40, duration=60)
+        self.assertFalse(routers.pinned_to_primary())
+        stack, queries = self.capture()
+        with stack, routers.use_replica():
+            list(Service.objects.all())
+        self.assertEqual(len(self.service_queries(queries['replica'])), 1)
+
+    def test_post_sets_pin_cookie(self):
+        response = self.client.post('/login/', {'username': 'nobody', 'password': 'x'}, secure=True)
+        cookie = response.cookies[ReplicaRoutingMiddleware.PIN_COOKIE]
+        self.assertEqual(cookie.value, '1')
+        self.assertEqual(cookie['max-age'], settings.NAILS_REPLICA_PIN_SECONDS)
+
+    def test_get_of_replica_view_reads_replica(self):
+        stack, queries = self.capture()
+        with stack:
+            response = self.client.get('/services/', secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(self.service_queries(queries['replica']))
+        self.assertEqual(self.service_queries(queries['default']), [])
+
+    def test_pinned_browser_reads_primary(self):
+        self.client.cookies[ReplicaRoutingMiddleware.PIN_COOKIE] = '1'
+        stack, queries = self.capture()
+        with stack:
+            self.client.get('/services/', secure=True)
+        self.assertEqual(self.service_queries(queries['replica']), [])
+        self.assertTrue(self.service_queries(queries['default']))
+
+
+def make_service(**kwargs):
+    fields = {'name': 'Gel Manicure', 'description': '', 'price': 40, 'duration': 60}
+    fields.update(kwargs)
+    return Service.objects.create(**fields)
+
+
+def make_appointment(service, **kwargs):
+    fields = {
+        'client_name': 'Ada Client',
+        'client_email': 'ada@example.com',
+        'client_phone': '555-000-0000',
+        'service': service,
+        'appointment_date': timezone.now().date() + timedelta(days=1),
+        'appointment_time': dt_time(10, 0),
+        'duration': service.duration,
+        'status': 'PENDING',
+    }
+    fields.update(kwargs)
+    return Appointment.objects.create(**fields)
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.service = make_service()
+        old = timezone.now().date() - timedelta(days=400)
+        for i in range(5):
+            make_appointment(self.service, appointment_date=old, status='COMPLETED',
+                             appointment_time=dt_time(9 + i, 0))
+        make_appointment(self.service, appointment_date=old, status='PENDING')
+        make_appointment(self.service, status='COMPLETED')
+
+    def test_moves_only_old_finished_appointments(self):
+        moved = list(archive_appointments(older_than_days=365, batch_size=2))
+        self.assertEqual(moved, [2, 2, 1])
+        self.assertEqual(ArchivedAppointment.objects.count(), 5)
+        self.assertEqual(Appointment.objects.count(), 2)
+        self.assertEqual(ArchivedAppointment.objects.first().service_name, 'Gel Manicure')
+
+    def test_conflict_rolls_back_the_batch(self):
+        appointment = Appointment.objects.filter(status='COMPLETED').order_by('id').first()
+        ArchivedAppointment.objects.create(
+            id=appointment.id, client_name='Earlier copy', client_email='a@example.com',
+            client_phone='1', service_name='Old', service_price=1, appointment_date=appointment.appointment_date,
+            appointment_time=appointment.appointment_time, duration=30, status='COMPLETED',
+            created_at=timezone.now(),
+        )
+        with self.assertRaises(IntegrityError):
+            archive_batch(timezone.now().date() - timedelta(days=365), 1000)
+        self.assertEqual(Appointment.objects.count(), 7)
+        self.assertEqual(ArchivedAppointment.objects.count(), 1)
+        with self.assertRaises(CommandError):
+            call_command('archive_appointments', stdout=io.StringIO())
+        self.assertEqual(Appointment.objects.count(), 7)
+
+    @override_settings(NAILS_SHARED_CACHE=True)
+    def test_one_event_and_version_bump_per_batch(self):
+        version = availability_version()
+        seq = events.publish('ping', {})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(archive_batch(timezone.now().date() - timedelta(days=365), 1000), 5)
+        self.assertEqual(availability_version(), version + 1)
+        self.assertEqual(cache.get(events.SEQUENCE_KEY), seq + 1)
+        event = cache.get(events.EVENT_KEY.format(seq + 1))
+        self.assertEqual(event['type'], 'appointments_archived')
+        self.assertEqual(event['data']['count'], 5)
+        self.assertEqual(event['data']['stats']['total'], 2)
+
+
+@override_settings(NAILS_SHARED_CACHE=True, NAILS_EVENT_BACKLOG=3)
+class EventTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_publish_appends_to_log(self):
+        first = events.publish('a', {'n': 1})
+        self.assertEqual(events.publish('b', {'n': 2}), first + 1)
+        self.assertEqual(cache.get(events.EVENT_KEY.format(first + 1)),
+                         {'id': first + 1, 'type': 'b', 'data': {'n': 2}})
+
+    def test_lost_sequence_restarts_past_old_ids(self):
+        seq = events.publish('a', {})
+        cache.clear()
+        later = time.time_ns() + 10**9
+        with mock.patch('nails.counters.time.time_ns', return_value=later):
+            self.assertGreater(events.publish('a', {}), seq)
+
+    @override_settings(NAILS_SHARED_CACHE=False)
+    def test_nothing_published_without_shared_cache(self):
+        self.assertIsNone(events.publish('a', {}))
+        self.assertIsNone(cache.get(events.SEQUENCE_KEY))
+
+    async def test_read_events(self):
+        first = events.publish('a', {})
+        for _ in range(4):
+            events.publish('b', {})
+        cache.delete(events.EVENT_KEY.format(first + 3))
+        latest, found = await events.read_events(first)
+        self.assertEqual(latest, first + 4)
+        # Capped at the backlog, skipping the expired one
+        self.assertEqual([event['id'] for event in found], [first + 2, first + 4])
+        self.assertEqual(await events.read_events(latest), (latest, []))
+
+    @override_settings(NAILS_EVENT_POLL_SECONDS=5)
+    async def test_stream(self):
+        seq = events.publish('a', {'n': 1})
+        with mock.patch.object(events.asyncio, 'sleep', mock.AsyncMock()):
+            messages = events.stream(seq - 1)
+            self.assertEqual(await anext(messages), "retry: 5000\n\n")
+            self.assertEqual(await anext(messages), f'id: {seq}\nevent: a\ndata: {{"n": 1}}\n\n')
+            # Three empty polls of 5 seconds, then a heartbeat
+            self.assertEqual(await anext(messages), ": keep-alive\n\n")
+            await messages.aclose()
+
+    def test_format_sse(self):
+        self.assertEqual(events.format_sse({'id': 7, 'type': 't', 'data': [1]}), 'id: 7\nevent: t\ndata: [1]\n\n')
+
+    def test_no_stream_under_wsgi(self):
+        client = Client(HTTP_HOST='localhost')
+        client.force_login(User.objects.create_user('owner', 'owner@example.com', 'pw', is_staff=True))
+        self.assertEqual(client.get(reverse('dashboard_events'), secure=True).status_code, 204)
+
+    @override_settings(NAILS_SHARED_CACHE=False)
+    async def test_no_stream_without_shared_cache(self):
+        user = await User.objects.acreate_user('owner', 'owner@example.com', 'pw', is_staff=True)
+        client = AsyncClient(HTTP_HOST='localhost')
+        await client.aforce_login(user)
+        response = await client.get(reverse('dashboard_events'), secure=True)
+        self.assertEqual(response.status_code, 204)
+
+    def test_login_required(self):
+        response = Client(HTTP_HOST='localhost').get(reverse('dashboard_events'), secure=True)
+        self.assertEqual(response.status_code, 302)
+
+
+class SeedingTests(TestCase):
+    FIELDS = ('client_name', 'client_email', 'client_phone', 'service__name', 'appointment_date',
+              'appointment_time', 'duration', 'special_requests', 'status', 'created_at')
+
+    def seeded_rows(self, **kwargs):
+        clear_salon()
+        seed_salon(appointments=60, services=5, portfolio=3, clients=20, batch_size=25,
+                   today=date(2025, 3, 14), **kwargs)
+        return list(Appointment.objects.order_by('id').values_list(*self.FIELDS))
+
+    def test_same_seed_and_today_give_identical_rows(self):
+        rows = self.seeded_rows(seed=7)
+        self.assertEqual(len(rows), 60)
+        self.assertEqual(self.seeded_rows(seed=7), rows)
+        self.assertNotEqual(self.seeded_rows(seed=8), rows)
+
+    def test_created_at_is_the_seeded_booking_time(self):
+        self.seeded_rows(seed=7)
+        for booked, day in Appointment.objects.values_list('created_at', 'appointment_date'):
+            self.assertLessEqual(booked.date(), day)
+            self.assertLess(booked.date(), date(2025, 5, 14))
+        # The model field itself is untouched
+        self.assertTrue(Appointment._meta.get_field('created_at').auto_now_add)
+        appointment = make_appointment(Service.objects.first())
+        self.assertAlmostEqual(appointment.created_at.timestamp(), time.time(), delta=60)
+
+
+class CalendarFeedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client(HTTP_HOST='localhost')
+        self.staff = User.objects.create_user('owner', 'owner@example.com', 'pw', is_staff=True)
+        make_appointment(make_service())
+
+    def feed_url(self, token):
+        return reverse('calendar_feed', args=[token])
+
+    def test_feed_for_valid_token(self):
+        response = self.client.get(self.feed_url(ics.feed_token(self.staff)), secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'BEGIN:VEVENT', response.content)
+
+    def test_token_is_stable_until_reset(self):
+        token = ics.feed_token(self.staff)
+        self.assertEqual(ics.feed_token(self.staff), token)
+        new_token = ics.reset_feed_token(self.staff)
+        self.assertNotEqual(new_token, token)
+        self.assertEqual(self.client.get(self.feed_url(token), secure=True).status_code, 404)
+        self.assertEqual(self.client.get(self.feed_url(new_token), secure=True).status_code, 200)
+
+    def test_reset_view(self):
+        token = ics.feed_token(self.staff)
+        self.client.force_login(self.staff)
+        response = self.client.post(reverse('calendar_feed_reset'), secure=True)
+        self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+        self.assertNotEqual(ics.feed_token(self.staff), token)
+
+    @override_settings(NAILS_REPLICA_VIEWS=[])
+    def test_dashboard_only_offers_staff_a_feed(self):
+        customer = User.objects.create_user('customer', 'c@example.com', 'pw')
+        for user, has_feed in ((customer, False), (self.staff, True)):
+            self.client.force_login(user)
+            response = self.client.get(reverse('dashboard'), secure=True)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual('Calendar Feed' in response.content.decode(), has_feed)
+            self.assertEqual(CalendarFeed.objects.filter(user=user).exists(), has_feed)
+
+    def test_unknown_token(self):
+        self.assertEqual(self.client.get(self.feed_url('not-a-token'), secure=True).status_code, 404)
+
+    def test_not_modified_until_data_changes(self):
+        url = self.feed_url(ics.feed_token(self.staff))
+        etag = self.client.get(url, secure=True)['ETag']
+        self.assertEqual(self.client.get(url, secure=True, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        make_appointment(Service.objects.get(), client_name='Bea')
+        self.assertEqual(self.client.get(url, secure=True, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_deactivated_staff_gets_404_not_304(self):
+        url = self.feed_url(ics.feed_token(self.staff))
+        etag = self.client.get(url, secure=True)['ETag']
+        User.objects.filter(pk=self.staff.pk).update(is_staff=False)
+        self.assertEqual(self.client.get(url, secure=True, HTTP_IF_NONE_MATCH=etag).status_code, 404)
+
+
+class BulkStatusTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        service = make_service()
+        self.appointments = {
+            status: make_appointment(service, status=status, client_name=status.title())
+            for status, _ in Appointment.STATUS_CHOICES
+        }
+
+    def ids(self, *statuses):
+        return [self.appointments[status].id for status in statuses]
+
+    def status_of(self, status):
+        return Appointment.objects.get(id=self.appointments[status].id).status
+
+    def test_skips_disallowed_transitions(self):
+        updated, skipped = bulk_update_status(self.ids('PENDING', 'CONFIRMED', 'COMPLETED'), 'CONFIRMED')
+        self.assertEqual(updated, self.ids('PENDING'))
+        self.assertEqual(skipped, 2)
+        self.assertEqual(self.status_of('PENDING'), 'CONFIRMED')
+        self.assertEqual(self.status_of('COMPLETED'), 'COMPLETED')
+
+    def test_no_show_only_from_open_appointments(self):
+        ids = self.ids('PENDING', 'CONFIRMED', 'COMPLETED', 'CANCELLED', 'NO_SHOW')
+        updated, skipped = bulk_update_status(ids, 'NO_SHOW')
+        self.assertEqual(sorted(updated), sorted(self.ids('PENDING', 'CONFIRMED')))
+        self.assertEqual(skipped, 3)
+        self.assertEqual(self.status_of('CANCELLED'), 'CANCELLED')
+
+    def test_unknown_ids_count_as_skipped(self):
+        updated, skipped = bulk_update_status(self.ids('PENDING') + [999999], 'CANCELLED')
+        self.assertEqual(updated, self.ids('PENDING'))
+        self.assertEqual(skipped, 1)
+
+    def test_duplicate_ids_counted_once(self):
+        updated, skipped = bulk_update_status(self.ids('PENDING') * 3, 'CANCELLED')
+        self.assertEqual((len(updated), skipped), (1, 0))
+
+    def test_empty_selection(self):
+        self.assertEqual(bulk_update_status([], 'CONFIRMED'), ([], 0))
+
+    def test_rejects_non_bulk_status(self):
+        with self.assertRaises(ValueError):
+            bulk_update_status(self.ids('CONFIRMED'), 'PENDING')
+
+    def test_single_update_and_one_signal(self):
+        version = availability_version()
+        received = []
+        handler = lambda sender, ids, status, **kwargs: received.append((sorted(ids), status))
+        appointments_status_changed.connect(handler)
+        self.addCleanup(appointments_status_changed.disconnect, handler)
+        with CaptureQueriesContext(connections['default']) as queries:
+            bulk_update_status(self.ids('PENDING', 'CONFIRMED'), 'COMPLETED')
+        updates = [query for query in queries if query['sql'].startswith('UPDATE "nails_appointment"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(received, [(sorted(self.ids('PENDING', 'CONFIRMED')), 'COMPLETED')])
+        self.assertEqual(availability_version(), version + 1)
+
+    def test_view_reports_updated_and_skipped(self):
+        user = User.objects.create_user('owner', 'owner@example.com', 'pw', is_staff=True)
+        client = Client(HTTP_HOST='localhost')
+        client.force_login(user)
+        response = client.post(reverse('appointment_bulk_status'), {
+            'status': 'CANCELLED',
+            'ids': [str(i) for i in self.ids('PENDING', 'COMPLETED')] + ['abc'],
+        }, secure=True)
+        texts = [str(message) for message in get_messages(response.wsgi_request)]
+        self.assertIn("1 appointment(s) marked as Cancelled.", texts)
+        self.assertIn("1 appointment(s) skipped: not allowed from their current status.", texts)
+        self.assertEqual(self.status_of('PENDING'), 'CANCELLED')
+
+    def test_view_rejects_unknown_status(self):
+        user = User.objects.create_user('owner', 'owner@example.com', 'pw', is_staff=True)
+        client = Client(HTTP_HOST='localhost')
+        client.force_login(user)
+        client.post(reverse('appointment_bulk_status'), {
+            'status': 'PENDING', 'ids': [str(i) for i in self.ids('CONFIRMED')],
+        }, secure=True)
+        self.assertEqual(self.status_of('CONFIRMED'), 'CONFIRMED')
+
+
+class SessionStoreTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_anonymous_session_is_cache_only(self):
+        session = SessionStore()
+        session['cart'] = 1
+        session.save()
+        self.assertFalse(Session.objects.filter(session_key=session.session_key).exists())
+        self.assertEqual(SessionStore(session.session_key)['cart'], 1)
+
+    def test_logged_in_session_writes_through_and_survives_cache_loss(self):
+        user = User.objects.create_user('owner', 'owner@example.com', 'pw', is_staff=True)
+        session = SessionStore()
+        session.create()
+        session[SESSION_KEY] = str(user.pk)
+        session.save()
+        self.assertTrue(Session.objects.filter(session_key=session.session_key).exists())
+        cache.clear()
+        self.assertEqual(SessionStore(session.session_key)[SESSION_KEY], str(user.pk))
+
+    def test_expired_sessions_deleted_in_batches(self):
+        past = timezone.now() - timedelta(days=1)
+        Session.objects.bulk_create([
+            Session(session_key=f'expired{i:033d}', session_data='', expire_date=past) for i in range(5)
+        ])
+        Session.objects.create(session_key='live' + '0' * 36, session_data='',
+                               expire_date=timezone.now() + timedelta(days=1))
+        self.assertEqual(list(SessionStore.expired_batches(batch_size=2)), [2, 2, 1])
+        self.assertEqual(Session.objects.count(), 1)
+
+    def test_shared_cache_required_for_cache_sessions(self):
+        if settings.REDIS_URL:
+            self.skipTest("REDIS_URL is set")
+        self.assertEqual(settings.SESSION_ENGINE, 'django.contrib.sessions.backends.db')
+
+
+class MessageStorageTests(TestCase):
+    def storage(self, **cookies):
+        request = RequestFactory().get('/')
+        request.COOKIES.update(cookies)
+        request.session = SessionStore()
+        return MessageStorage(request)
+
+    def test_cookie_only_without_session_cookie(self):
+        self.assertEqual([type(s) for s in self.storage().storages], [CookieStorage])
+
+    def test_session_overflow_with_session_cookie(self):
+        storage = self.storage(**{settings.SESSION_COOKIE_NAME: 'abc'})
+        self.assertEqual([type(s) for s in storage.storages], [CookieStorage, SessionStorage])
+
+    def test_responses_without_messages_dont_vary_on_cookie(self):
+        client = Client(HTTP_HOST='localhost')
+        client.force_login(User.objects.create_user('owner', 'owner@example.com', 'pw', is_staff=True))
+        for c in (client, Client(HTTP_HOST='localhost')):
+            response = c.get(reverse('serviceworker'), secure=True)
+            self.assertEqual(response.status_code, 302)
+            self.assertNotIn('Vary', response)
+
+
+class MediaTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.storage = HashedMediaStorage()
+        self.client = Client(HTTP_HOST='localhost')
+
+    def get(self, name, **headers):
+        return self.client.get(reverse('media', kwargs={'path': name}), secure=True, headers=headers)
+
+    def content(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_hashed_name_and_dedupe(self):
+        name = self.storage.save('portfolio/Rose.JPG', ContentFile(b'petals'))
+        self.assertRegex(name, r'^portfolio/Rose\.[0-9a-f]{12}\.jpg$')
+        self.assertTrue(is_hashed_name(name))
+        self.assertEqual(self.storage.save('portfolio/other.jpg', ContentFile(b'petals')).split('.')[1], name.split('.')[1])
+        self.assertEqual(self.storage.save('portfolio/Rose.JPG', ContentFile(b'petals')), name)
+        self.assertNotEqual(self.storage.save('portfolio/Rose.JPG', ContentFile(b'thorns')), name)
+        self.assertEqual(len(os.listdir(os.path.join(self.media_root, 'portfolio'))), 3)
+
+    def test_gzip_twin_only_for_compressible_files(self):
+        svg = self.storage.save('art.svg', ContentFile(b'<svg>' + b'<g/>' * 200 + b'</svg>'))
+        jpg = self.storage.save('art.jpg', ContentFile(b'x' * 1000))
+        self.assertTrue(os.path.exists(self.storage.path(svg) + '.gz'))
+        self.assertFalse(os.path.exists(self.storage.path(jpg) + '.gz'))
+        self.storage.delete(svg)
+        self.assertFalse(os.path.exists(self.storage.path(svg) + '.gz'))
+
+    def test_hashed_files_are_immutable(self):
+        hashed = self.storage.save('a.txt', ContentFile(b'hello'))
+        with open(os.path.join(self.media_root, 'plain.txt'), 'wb') as f:
+            f.write(b'hello')
+        response = self.get(hashed)
+        self.assertEqual(self.content(response), b'hello')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertNotIn('immutable', self.get('plain.txt')['Cache-Control'])
+
+    def test_not_modified(self):
+        name = self.storage.save('a.txt', ContentFile(b'hello'))
+        response = self.get(name)
+        self.assertEqual(self.get(name, If_None_Match=response['ETag']).status_code, 304)
+        self.assertEqual(self.get(name, If_Modified_Since=response['Last-Modified']).status_code, 304)
+        self.assertEqual(self.get(name, If_None_Match='"other"').status_code, 200)
+
+    def test_ranges(self):
+        name = self.storage.save('a.txt', ContentFile(b'0123456789'))
+        response = self.get(name, Range='bytes=2-4')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 2-4/10')
+        self.assertEqual(self.content(response), b'234')
+        response = self.get(name, Range='bytes=-3')
+        self.assertEqual(self.content(response), b'789')
+        response = self.get(name, Range='bytes=20-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */10')
+        # A stale If-Range sends the whole file
+        self.assertEqual(self.get(name, Range='bytes=2-4', If_Range='"old"').status_code, 200)
+
+    def test_empty_file_range_not_satisfiable(self):
+        name = self.storage.save('empty.txt', ContentFile(b''))
+        for header in ('bytes=-5', 'bytes=0-'):
+            response = self.get(name, Range=header)
+            self.assertEqual(response.status_code, 416)
+            self.assertEqual(response['Content-Range'], 'bytes */0')
+
+    def test_gzip_variant_and_vary(self):
+        body = b'<svg>' + b'<g/>' * 200 + b'</svg>'
+        name = self.storage.save('art.svg', ContentFile(body))
+        response = self.get(name, Accept_Encoding='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(self.content(response)), body)
+        self.assertIn('Accept-Encoding', response['Vary'])
+        response = self.get(name)
+        self.assertNotIn('Content-Encoding', response)
+        self.assertIn('Accept-Encoding', response['Vary'])
+        # No compressed twin, nothing to vary on
+        self.assertNotIn('Vary', self.get(self.storage.save('a.jpg', ContentFile(b'jpg'))))
+
+    def test_missing_and_traversal(self):
+        self.assertEqual(self.get('nope.txt').status_code, 404)
+        self.assertEqual(self.get('../settings.py').status_code, 404)
+
+
+class ApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client(HTTP_HOST='localhost')
+        self.client.force_login(User.objects.create_user('owner', 'owner@example.com', 'pw', is_staff=True))
+        self.service = make_service()
+        day = timezone.now().date()
+        # Several appointments share a date and time so the cursor's id tiebreak matters
+        for i in range(13):
+            make_appointment(
+                self.service,
+                client_name=f'Client {i}',
+                client_email=f'client{i % 5}@example.com',
+                appointment_date=day + timedelta(days=i % 3),
+                appointment_time=dt_time(9 + i % 2, 0),
+            )
+
+    def get(self, name, **params):
+        return self.client.get(reverse(name), params, secure=True)
+
+    def walk(self, name, **params):
+        """Every page of an endpoint, following ``next`` links"""
+        results, pages = [], 0
+        response = self.get(name, **params)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            results.extend(data['results'])
+            pages += 1
+            if not data['next']:
+                return results, pages
+            response = self.client.get(data['next'], secure=True)
+
+    def test_keyset_pages_have_no_duplicates_or_gaps(self):
+        for limit in (1, 2, 4, 13, 50):
+            results, pages = self.walk('api_appointments', limit=limit)
+            ids = [row['id'] for row in results]
+            self.assertEqual(sorted(ids), sorted(Appointment.objects.values_list('id', flat=True)))
+            self.assertEqual(len(ids), len(set(ids)))
+            self.assertEqual(pages, -(-13 // limit))
+            keys = [(row['date'], row['time'], row['id']) for row in results]
+            self.assertEqual(keys, sorted(keys))
+
+    def test_client_pages(self):
+        results, _ = self.walk('api_clients', limit=2)
+        self.assertEqual(len(results), 13)
+        self.assertEqual(len({(row['email'], row['name']) for row in results}), 13)
+        self.assertEqual(results[0]['appointments'], 1)
+
+    def test_sparse_fieldsets(self):
+        row = self.get('api_appointments', fields='status,id', limit=1).json()['results'][0]
+        self.assertEqual(list(row), ['status', 'id'])
+        row = self.get('api_clients', fields='email', limit=1).json()['results'][0]
+        self.assertEqual(list(row), ['email'])
+        stats = self.get('api_stats', fields='total,pending').json()
+        self.assertEqual(stats['total'], 13)
+        self.assertNotIn('revenue', stats)
+
+    def test_filters(self):
+        today = timezone.now().date()
+        results, _ = self.walk('api_appointments', date_from=today.isoformat(), date_to=today.isoformat())
+        self.assertEqual({row['date'] for row in results}, {today.isoformat()})
+        self.assertEqual(len(self.walk('api_appointments', status='confirmed')[0]), 0)
+
+    def test_bad_fields(self):
+        response = self.get('api_appointments', fields='id,bogus')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('bogus', response.json()['error'])
+
+    def test_bad_limit(self):
+        for limit in ('0', '-3', 'abc'):
+            self.assertEqual(self.get('api_appointments', limit=limit).status_code, 400)
+
+    @override_settings(NAILS_API_MAX_PAGE_SIZE=5)
+    def test_limit_capped(self):
+        self.assertEqual(len(self.get('api_appointments', limit=100).json()['results']), 5)
+
+    def test_bad_cursors(self):
+        def cursor(values):
+            return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+        for bad in ('!!!', 'e30', cursor(['a', 'b', 'c']), cursor(['2025-01-01', '10:00:00']),
+                    cursor(['2025-01-01', '10:00:00', 'x']), cursor([1, 2, 3]),
+                    cursor(['2025-02-30', '10:00:00', '1'])):
+            response = self.get('api_appointments', cursor=bad)
+            self.assertEqual(response.status_code, 400, bad)
+            self.assertEqual(response.json(), {'error': 'Invalid cursor'})
+
+    def test_bad_date(self):
+        self.assertEqual(self.get('api_appointments', date_from='yesterday').status_code, 400)
+
+    def test_login_required(self):
+        self.client.logout()
+        response = self.get('api_stats')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response['Content-Type'], 'application/json')
+
+    def test_read_only(self):
+        self.assertEqual(self.client.post(reverse('api_services'), secure=True).status_code, 405)
+
+    def test_etag_not_modified_until_data_changes(self):
+        etag = self.get('api_appointments')['ETag']
+        response = self.client.get(reverse('api_appointments'), secure=True, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        make_appointment(self.service, client_name='Late booking')
+        response = self.client.get(reverse('api_appointments'), secure=True, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_changes_after_bulk_update(self):
+        etag = self.get('api_stats')['ETag']
+        bulk_update_status(Appointment.objects.values_list('id', flat=True)[:2], 'CONFIRMED')
+        response = self.client.get(reverse('api_stats'), secure=True, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['confirmed'], 2)
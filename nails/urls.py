@@ -3,6 +3,7 @@ from . import views
 from django.views.generic import TemplateView
 from django.contrib.staticfiles.storage import staticfiles_storage
 from django.views.generic.base import RedirectView
+from django.utils.functional import lazy
 
 urlpatterns = [
     # Public URLs
@@ -18,16 +19,31 @@ urlpatterns = [
     
     # Dashboard URLs
     path('dashboard/', views.dashboard, name='dashboard'),
+    path('dashboard/events/', views.dashboard_events, name='dashboard_events'),
     path('dashboard/appointments/', views.appointment_list, name='appointment_list'),
+    path('dashboard/appointments/bulk-status/', views.appointment_bulk_status, name='appointment_bulk_status'),
+    path('dashboard/appointments/export/', views.appointment_export, name='appointment_export'),
     path('dashboard/appointments/<int:appointment_id>/', views.appointment_detail, name='appointment_detail'),
     path('dashboard/appointments/<int:appointment_id>/update-status/', 
          views.update_appointment_status, name='update_appointment_status'),
     path('dashboard/clients/', views.client_list, name='client_list'),
     path('dashboard/analytics/', views.analytics, name='analytics'),
+    path('dashboard/metrics/', views.metrics_view, name='metrics'),
+    path('dashboard/profiles/', views.profile_list, name='profile_list'),
+    path('dashboard/profiles/<str:name>/', views.profile_detail, name='profile_detail'),
+    
+    # Read-only JSON API for the dashboard app
+    path('dashboard/api/appointments/', views.api_appointments, name='api_appointments'),
+    path('dashboard/api/clients/', views.api_clients, name='api_clients'),
+    path('dashboard/api/services/', views.api_services, name='api_services'),
+    path('dashboard/api/stats/', views.api_stats, name='api_stats'),
+    path('calendar/<str:token>/appointments.ics', views.calendar_feed, name='calendar_feed'),
+    path('dashboard/calendar/reset/', views.calendar_feed_reset, name='calendar_feed_reset'),
     path('offline/', TemplateView.as_view(template_name='offline.html'), name='offline'),
     path(
         'serviceworker.js', 
-        RedirectView.as_view(url=staticfiles_storage.url('sw.js')),
+        # Resolved per request: the manifest may not exist yet at import time
+        RedirectView.as_view(url=lazy(staticfiles_storage.url, str)('sw.js')),
         name='serviceworker'
     ),
 ]
\ No newline at end of file
@@ -1,16 +1,32 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
-from django.http import JsonResponse
+from django.http import JsonResponse, HttpResponse, Http404, StreamingHttpResponse
 from django.db.models import Q
 from datetime import datetime, date, time, timedelta
-from django.contrib.auth.decorators import login_required
+from django.contrib.auth.decorators import login_required, user_passes_test
 from django.core.paginator import Paginator, PageNotAnInteger, EmptyPage
-from .models import Service, PortfolioItem, Appointment, WorkingHours
+from .models import Service, PortfolioItem, Appointment, ArchivedAppointment, WorkingHours
 from .forms import AppointmentForm
 from .emails import send_appointment_confirmation, send_admin_notification
 from django.utils import timezone
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.forms import AuthenticationForm
+from . import api, events, ics, metrics, profiling
+from .ratelimit import rate_limit
+from .coalescing import coalesce
+from .archiving import ChainedResults
+from .bulk import BULK_STATUSES, bulk_update_status
+from .signals import availability_version
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.urls import reverse
+from django.views.decorators.http import condition, require_safe
+from django.views.decorators.gzip import gzip_page
+import csv
+import logging
+
+logger = logging.getLogger(__name__)
+
 def home(request):
     # Show featured portfolio items on the homepage
     featured_nails = PortfolioItem.objects.filter(featured=True)[:6]  # Show 6 featured items
@@ -25,6 +41,7 @@ def portfolio(request):
     portfolio_items = PortfolioItem.objects.all()
     return render(request, 'nails/portfolio.html', {'portfolio_items': portfolio_items})
 
+@rate_limit('booking', settings.NAILS_RATELIMIT_BOOKING, methods=('POST',))
 def book_appointment(request):
     if request.method == 'POST':
         form = AppointmentForm(request.POST)
@@ -63,7 +80,7 @@ def book_appointment(request):
                 except Exception as e:
                     # If email fails, still show success but with a note
                     messages.success(request, "Your appointment has been booked! (There was an issue sending the confirmation email, but your booking is confirmed.)")
-                    print(f"Email error: {e}")
+                    logger.exception("Email error: %s", e)
                 
                 return redirect('home')
     else:
@@ -77,6 +94,49 @@ def calculate_end_time(start_time, duration_minutes):
     end_datetime = start_datetime + timedelta(minutes=duration_minutes)
     return end_datetime.time()
 
+def compute_available_times(selected_date, service):
+    """Return the free 30-minute slot start times for a service on a date"""
+    # Get working hours for that day of week
+    day_of_week = selected_date.weekday()
+    working_hours = WorkingHours.objects.filter(day_of_week=day_of_week, is_working=True).first()
+    
+    if not working_hours:
+        return []
+    
+    # Get booked appointments for that date
+    booked_appointments = Appointment.objects.filter(
+        appointment_date=selected_date,
+        status__in=['PENDING', 'CONFIRMED']
+    )
+    
+    # Generate available time slots (every 30 minutes)
+    available_times = []
+    current_time = working_hours.start_time
+    
+    while current_time < working_hours.end_time:
+        # Check if this time slot is available
+        slot_end = calculate_end_time(current_time, service.duration)
+        
+        # Check if this slot overlaps with any existing appointment
+        is_available = True
+        for appointment in booked_appointments:
+            appointment_end = calculate_end_time(appointment.appointment_time, appointment.duration)
+            
+            # Check for time overlap
+            if (current_time < appointment_end and slot_end > appointment.appointment_time):
+                is_available = False
+                break
+        
+        if is_available and slot_end <= working_hours.end_time:
+            available_times.append(current_time.strftime('%H:%M'))
+        
+        # Move to next slot (30-minute increments)
+        current_time_dt = datetime.combine(date.today(), current_time) + timedelta(minutes=30)
+        current_time = current_time_dt.time()
+    
+    return available_times
+
+@rate_limit('availability', settings.NAILS_RATELIMIT_AVAILABILITY, json=True)
 def get_available_times(request):
     """API endpoint to get available times for a selected date"""
     selected_date = request.GET.get('date')
@@ -89,44 +149,14 @@ def get_available_times(request):
         selected_date = datetime.strptime(selected_date, '%Y-%m-%d').date()
         service = Service.objects.get(id=service_id)
         
-        # Get working hours for that day of week
-        day_of_week = selected_date.weekday()
-        working_hours = WorkingHours.objects.filter(day_of_week=day_of_week, is_working=True).first()
-        
-        if not working_hours:
-            return JsonResponse({'available_times': []})
-        
-        # Get booked appointments for that date
-        booked_appointments = Appointment.objects.filter(
-            appointment_date=selected_date,
-            status__in=['PENDING', 'CONFIRMED']
+        # Identical concurrent queries share one computation
+        cache_key = f"availability:{availability_version()}:{selected_date}:{service.id}"
+        available_times = coalesce(
+            cache_key,
+            lambda: compute_available_times(selected_date, service),
+            ttl=settings.NAILS_AVAILABILITY_CACHE_SECONDS,
         )
         
-        # Generate available time slots (every 30 minutes)
-        available_times = []
-        current_time = working_hours.start_time
-        
-        while current_time < working_hours.end_time:
-            # Check if this time slot is available
-            slot_end = calculate_end_time(current_time, service.duration)
-            
-            # Check if this slot overlaps with any existing appointment
-            is_available = True
-            for appointment in booked_appointments:
-                appointment_end = calculate_end_time(appointment.appointment_time, appointment.duration)
-                
-                # Check for time overlap
-                if (current_time < appointment_end and slot_end > appointment.appointment_time):
-                    is_available = False
-                    break
-            
-            if is_available and slot_end <= working_hours.end_time:
-                available_times.append(current_time.strftime('%H:%M'))
-            
-            # Move to next slot (30-minute increments)
-            current_time_dt = datetime.combine(date.today(), current_time) + timedelta(minutes=30)
-            current_time = current_time_dt.time()
-        
         return JsonResponse({'available_times': available_times})
     
     except Service.DoesNotExist:
@@ -174,34 +204,77 @@ def dashboard(request):
         'recent_appointments': recent_appointments,
         'today': today,
         'tomorrow': tomorrow,
+        # Only staff feeds resolve, so don't hand anyone else a token
+        'calendar_feed_url': request.build_absolute_uri(
+            reverse('calendar_feed', args=[ics.feed_token(request.user)])
+        ) if request.user.is_staff else None,
     }
     
     return render(request, 'nails/dashboard.html', context)
 
-@login_required
-def appointment_list(request):
-    """View all appointments with filtering and search"""
-    appointments = Appointment.objects.all().order_by('-appointment_date', '-appointment_time')
-    
-    # Get filter parameters
-    status_filter = request.GET.get('status', '')
-    date_filter = request.GET.get('date', '')
-    search_query = request.GET.get('search', '')
-    
-    # Apply filters
+def filter_appointments(queryset, status_filter, date_filter, search_query, service_field='service__name'):
+    """Apply the appointment list filters to a live or archived queryset"""
     if status_filter:
-        appointments = appointments.filter(status=status_filter)
+        queryset = queryset.filter(status=status_filter)
     
     if date_filter:
-        appointments = appointments.filter(appointment_date=date_filter)
+        queryset = queryset.filter(appointment_date=date_filter)
     
     if search_query:
-        appointments = appointments.filter(
+        queryset = queryset.filter(
             Q(client_name__icontains=search_query) |
             Q(client_email__icontains=search_query) |
             Q(client_phone__icontains=search_query) |
-            Q(service__name__icontains=search_query)
+            Q(**{f'{service_field}__icontains': search_query})
         )
+    return queryset
+
+def get_filtered_appointments(request):
+    """Live appointments matching the request's filters, plus the archive if asked"""
+    status_filter = request.GET.get('status', '')
+    date_filter = request.GET.get('date', '')
+    search_query = request.GET.get('search', '')
+    include_archive = request.GET.get('archive') == '1'
+    
+    appointments = filter_appointments(
+        Appointment.objects.select_related('service').order_by('-appointment_date', '-appointment_time'),
+        status_filter, date_filter, search_query,
+    )
+    if include_archive:
+        archived = filter_appointments(
+            ArchivedAppointment.objects.order_by('-appointment_date', '-appointment_time'),
+            status_filter, date_filter, search_query, service_field='service_name',
+        )
+        appointments = ChainedResults(appointments, archived)
+    
+    filters = {
+        'status_filter': status_filter,
+        'date_filter': date_filter,
+        'search_query': search_query,
+        'include_archive': include_archive,
+    }
+    return appointments, filters
+
+@login_required
+async def dashboard_events(request):
+    """Server-Sent Events stream of appointment changes for the dashboard"""
+    if not isinstance(request, ASGIRequest) or not settings.NAILS_SHARED_CACHE:
+        # Under WSGI a stream would pin a sync worker forever, and without
+        # Redis there is no event log to read. 204 tells EventSource not to
+        # reconnect, so the dashboard just stays static.
+        return HttpResponse(status=204)
+    
+    last_event_id = request.headers.get('Last-Event-ID', '')
+    last_event_id = int(last_event_id) if last_event_id.isdigit() else None
+    response = StreamingHttpResponse(events.stream(last_event_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+@login_required
+def appointment_list(request):
+    """View all appointments with filtering and search"""
+    appointments, filters = get_filtered_appointments(request)
     
     # Pagination
     page = request.GET.get('page', 1)
@@ -217,12 +290,46 @@ def appointment_list(request):
     context = {
         'appointments': appointments_page,
         'status_choices': Appointment.STATUS_CHOICES,
-        'status_filter': status_filter,
-        'date_filter': date_filter,
-        'search_query': search_query,
+        **filters,
     }
     return render(request, 'nails/appointment_list.html', context)
 
+@login_required
+def appointment_export(request):
+    """Stream the filtered appointment list as CSV"""
+    appointments, filters = get_filtered_appointments(request)
+    
+    def rows():
+        buffer = _EchoBuffer()
+        writer = csv.writer(buffer)
+        yield writer.writerow(['id', 'client_name', 'client_email', 'client_phone', 'service',
+                               'price', 'date', 'time', 'duration', 'status', 'archived'])
+        for appointment in appointments.iterator():
+            archived = getattr(appointment, 'is_archived', False)
+            yield writer.writerow([
+                appointment.id,
+                appointment.client_name,
+                appointment.client_email,
+                appointment.client_phone,
+                appointment.service_name if archived else appointment.service.name,
+                appointment.service_price if archived else appointment.service.price,
+                appointment.appointment_date,
+                appointment.appointment_time,
+                appointment.duration,
+                appointment.status,
+                'yes' if archived else 'no',
+            ])
+    
+    response = StreamingHttpResponse(rows(), content_type='text/csv')
+    filename = 'appointments-with-archive.csv' if filters['include_archive'] else 'appointments.csv'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+class _EchoBuffer:
+    """File-like object csv.writer can write into, returning each row"""
+    def write(self, value):
+        return value
+
 @login_required
 def appointment_detail(request, appointment_id):
     """View detailed information about a specific appointment"""
@@ -257,6 +364,29 @@ def update_appointment_status(request, appointment_id):
     referer = request.META.get('HTTP_REFERER', '/dashboard/')
     return redirect(referer)
 
+@login_required
+def appointment_bulk_status(request):
+    """Apply one status to many selected appointments in a single UPDATE"""
+    if request.method == 'POST':
+        new_status = request.POST.get('status')
+        ids = [value for value in request.POST.getlist('ids') if value.isdigit()]
+        
+        if new_status not in BULK_STATUSES:
+            messages.error(request, "Please choose a valid bulk action.")
+        elif not ids:
+            messages.error(request, "Select at least one appointment first.")
+        else:
+            updated_ids, skipped = bulk_update_status([int(value) for value in ids], new_status)
+            label = dict(Appointment.STATUS_CHOICES)[new_status]
+            if updated_ids:
+                messages.success(request, f"{len(updated_ids)} appointment(s) marked as {label}.")
+            if skipped:
+                messages.warning(request, f"{skipped} appointment(s) skipped: not allowed from their current status.")
+    
+    # Redirect back to the previous page or dashboard
+    referer = request.META.get('HTTP_REFERER', '/dashboard/')
+    return redirect(referer)
+
 @login_required
 def client_list(request):
     """View all clients"""
@@ -315,28 +445,175 @@ def analytics(request):
 @login_required
 def client_list(request):
     """View all clients with search functionality"""
-    clients_data = Appointment.objects.values(
-        'client_name', 'client_email', 'client_phone'
-    ).distinct()
-    
-    # Search functionality
     search_query = request.GET.get('search', '')
-    if search_query:
-        clients_data = clients_data.filter(
-            Q(client_name__icontains=search_query) |
-            Q(client_email__icontains=search_query) |
-            Q(client_phone__icontains=search_query)
-        )
+    include_archive = request.GET.get('archive') == '1'
+    
+    def search(queryset):
+        queryset = queryset.values('client_name', 'client_email', 'client_phone')
+        if search_query:
+            queryset = queryset.filter(
+                Q(client_name__icontains=search_query) |
+                Q(client_email__icontains=search_query) |
+                Q(client_phone__icontains=search_query)
+            )
+        return queryset
+    
+    clients_data = search(Appointment.objects.order_by()).distinct()
+    if include_archive:
+        # UNION drops the duplicates between live and archived rows
+        clients_data = clients_data.union(search(ArchivedAppointment.objects.order_by()))
     
     clients_list = list(clients_data)
     
     context = {
         'clients': clients_list,
         'search_query': search_query,
+        'include_archive': include_archive,
     }
     return render(request, 'nails/client_list.html', context)
 
+@login_required
+def metrics_view(request):
+    """Expose request, query and email metrics in Prometheus text format"""
+    return HttpResponse(
+        metrics.render_all(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
+
+@user_passes_test(lambda u: u.is_staff)
+def profile_list(request):
+    """Browse the stored profiling reports, newest first"""
+    reports = []
+    for name in profiling.list_reports():
+        report = profiling.load_report(name)
+        if report is not None:
+            report.pop('queries', None)
+            report.pop('profile', None)
+            report['name'] = name
+            reports.append(report)
+    return render(request, 'nails/profile_list.html', {'reports': reports})
+
+@user_passes_test(lambda u: u.is_staff)
+def profile_detail(request, name):
+    """Show one profiling report with its SQL and cProfile output"""
+    report = profiling.load_report(name)
+    if report is None:
+        raise Http404("Profile not found")
+    return render(request, 'nails/profile_detail.html', {'report': report, 'name': name})
+
+def get_calendar_feed_user(request, token):
+    """Look the token up once per request; both the ETag and the view need it"""
+    if not hasattr(request, 'calendar_feed_user'):
+        request.calendar_feed_user = ics.user_for_token(token)
+    return request.calendar_feed_user
+
+def parse_calendar_statuses(request):
+    statuses = [status for status in request.GET.get('status', '').upper().split(',') if status]
+    return sorted(set(statuses) & set(dict(Appointment.STATUS_CHOICES)))
+
+def calendar_feed_etag(request, token):
+    # Revoked tokens and deactivated staff must not keep getting 304s
+    if get_calendar_feed_user(request, token) is None:
+        return None
+    statuses = ','.join(parse_calendar_statuses(request)) or 'all'
+    return f"{availability_version()}-{timezone.now().date()}-{statuses}"
+
+@condition(etag_func=calendar_feed_etag)
+def calendar_feed(request, token):
+    """Token-protected iCalendar feed of recent and upcoming appointments"""
+    if get_calendar_feed_user(request, token) is None:
+        raise Http404("Calendar feed not found")
+    
+    start = timezone.now().date() - timedelta(days=settings.NAILS_CALENDAR_PAST_DAYS)
+    appointments = Appointment.objects.filter(appointment_date__gte=start).order_by('appointment_date', 'appointment_time')
+    statuses = parse_calendar_statuses(request)
+    if statuses:
+        appointments = appointments.filter(status__in=statuses)
+    
+    response = HttpResponse(ics.build_feed(appointments), content_type='text/calendar; charset=utf-8')
+    response['Content-Disposition'] = 'inline; filename="elegant-nails.ics"'
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+@user_passes_test(lambda u: u.is_staff)
+def calendar_feed_reset(request):
+    """Replace the staff member's feed URL, revoking the old one"""
+    if request.method == 'POST':
+        ics.reset_feed_token(request.user)
+        messages.success(request, "Your calendar feed link has been reset. Subscribe to the new link.")
+    return redirect('dashboard')
 
+@gzip_page
+@require_safe
+@api.api_view
+@condition(etag_func=api.data_etag)
+def api_appointments(request):
+    """Keyset-paginated appointments, filterable by status and date range"""
+    selected = api.parse_fields(request, api.APPOINTMENT_FIELDS)
+    appointments = Appointment.objects.all()
+    statuses = parse_calendar_statuses(request)
+    if statuses:
+        appointments = appointments.filter(status__in=statuses)
+    date_from = api.parse_date(request, 'date_from')
+    if date_from:
+        appointments = appointments.filter(appointment_date__gte=date_from)
+    date_to = api.parse_date(request, 'date_to')
+    if date_to:
+        appointments = appointments.filter(appointment_date__lte=date_to)
+    search_query = request.GET.get('search', '')
+    if search_query:
+        appointments = filter_appointments(appointments, '', '', search_query)
+    return api.json_response(api.paginate_values(
+        request, appointments, api.APPOINTMENT_FIELDS, selected, api.APPOINTMENT_ORDERING,
+    ))
+
+@gzip_page
+@require_safe
+@api.api_view
+@condition(etag_func=api.data_etag)
+def api_clients(request):
+    """Distinct clients with their appointment count and latest visit"""
+    selected = api.parse_fields(request, api.CLIENT_FIELDS)
+    aggregates = {name: api.CLIENT_AGGREGATES[name] for name in selected if name in api.CLIENT_AGGREGATES}
+    clients = Appointment.objects.order_by().values(*api.CLIENT_ORDERING)
+    clients = clients.annotate(**aggregates) if aggregates else clients.distinct()
+    search_query = request.GET.get('search', '')
+    if search_query:
+        clients = clients.filter(
+            Q(client_name__icontains=search_query) |
+            Q(client_email__icontains=search_query) |
+            Q(client_phone__icontains=search_query)
+        )
+    return api.json_response(api.paginate_values(
+        request, clients, api.CLIENT_FIELDS, selected, api.CLIENT_ORDERING,
+    ))
+
+@gzip_page
+@require_safe
+@api.api_view
+@condition(etag_func=api.data_etag)
+def api_services(request):
+    """Services, including inactive ones unless ?active=1"""
+    selected = api.parse_fields(request, api.SERVICE_FIELDS)
+    service_list = Service.objects.all()
+    if request.GET.get('active') == '1':
+        service_list = service_list.filter(is_active=True)
+    return api.json_response(api.paginate_values(
+        request, service_list, api.SERVICE_FIELDS, selected, api.SERVICE_ORDERING,
+    ))
+
+@gzip_page
+@require_safe
+@api.api_view
+@condition(etag_func=api.data_etag)
+def api_stats(request):
+    """Dashboard counters and completed revenue in one aggregate query"""
+    today = timezone.now().date()
+    available = api.stat_aggregates(today)
+    selected = api.parse_fields(request, available)
+    stats = Appointment.objects.aggregate(**{name: available[name] for name in selected})
+    stats['date'] = today
+    return api.json_response(stats)
 
 def login_view(request):
     """Simple login view"""
@@ -1,4 +1,4 @@
-const CACHE_NAME = 'elegant-nails-v1.0.0';
+const CACHE_NAME = 'elegant-nails-v1.1.0';
 const urlsToCache = [
   '/',
   '/static/css/styles.css',
@@ -43,6 +43,26 @@ self.addEventListener('fetch', event => {
     return;
   }
 
+  // Dashboard API: network first so data stays fresh (the browser revalidates
+  // with the ETag, so unchanged data costs a 304), cached copy when offline
+  if (new URL(event.request.url).pathname.startsWith('/dashboard/api/')) {
+    event.respondWith(
+      fetch(event.request)
+        .then(fetchResponse => {
+          if (fetchResponse && fetchResponse.status === 200) {
+            const responseToCache = fetchResponse.clone();
+            caches.open(CACHE_NAME)
+              .then(cache => {
+                cache.put(event.request, responseToCache);
+              });
+          }
+          return fetchResponse;
+        })
+        .catch(() => caches.match(event.request))
+    );
+    return;
+  }
+
   event.respondWith(
     caches.match(event.request)
       .then(response => {